@@ -0,0 +1,78 @@
+# code_lists.py
+# 銘柄コードのリスト (CSV / TXT / XLSX) をメモリ上に直接読み込む
+# 複数ファイルをまとめて読み、表記をそろえて重複を除く
+import csv
+from pathlib import Path
+
+SUPPORTED_SUFFIXES = (".csv", ".txt", ".xlsx", ".xlsm")
+
+# 見出し行とみなす列名 (この列を銘柄コードとして読む)
+HEADER_NAMES = ("code", "codes", "ticker", "symbol", "stock code")
+
+
+def normalize_code(value):
+    """セルの値を銘柄コードにそろえる (空欄・コメント行は None)"""
+    if value is None:
+        return None
+    code = str(value).strip().strip('"').strip("'").lstrip("﻿").strip()
+    if not code or code.startswith("#") or code.lower() in ("nan", "none"):
+        return None
+    return code.upper()
+
+
+def _pick_column(first_row):
+    """1行目が見出しなら (コード列の番号, True)、そうでなければ (0, False)"""
+    for i, cell in enumerate(first_row):
+        if str(cell or "").strip().lower() in HEADER_NAMES:
+            return i, True
+    return 0, False
+
+
+def _iter_rows(path):
+    """ファイルの各行をセルのリストとして1行ずつ返す (全体を読み込まない)"""
+    suffix = path.suffix.lower()
+    if suffix in (".csv", ".txt"):
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            for row in csv.reader(f):
+                yield row
+    elif suffix in (".xlsx", ".xlsm"):
+        from openpyxl import load_workbook
+        wb = load_workbook(path, read_only=True, data_only=True)
+        try:
+            for row in wb.worksheets[0].iter_rows(values_only=True):
+                yield list(row)
+        finally:
+            wb.close()
+    else:
+        raise ValueError(f"未対応のファイル形式です: {path} (対応: {', '.join(SUPPORTED_SUFFIXES)})")
+
+
+def iter_codes(*paths):
+    """
+    複数のリストファイルから銘柄コードを1件ずつ返すジェネレーター (大きなリスト用)。
+    ファイルをまたいで重複したコードは最初の1回だけ返す。
+    1行目に "Code" などの見出しがあればその列を、無ければ1列目を読む。
+    """
+    seen = set()
+    for path in paths:
+        path = Path(path)
+        if not path.exists():
+            raise FileNotFoundError(f"リストファイル '{path}' が見つかりません。")
+
+        column = 0
+        for row_number, row in enumerate(_iter_rows(path)):
+            if row_number == 0:
+                column, has_header = _pick_column(row)
+                if has_header:
+                    continue
+            code = normalize_code(row[column]) if len(row) > column else None
+            if code and code not in seen:
+                seen.add(code)
+                yield code
+
+
+def load_codes(*paths):
+    """複数のリストファイルを読み、重複を除いた銘柄コードのリストを返す (入力順)"""
+    codes = list(iter_codes(*paths))
+    print(f"{', '.join(str(p) for p in paths)} から {len(codes)} 件の銘柄コードを読み込みました。")
+    return codes
@@ -3,34 +3,9 @@ import pandas as pd
 import datetime
 from pathlib import Path
 import sys
-from openpyxl import load_workbook
-from openpyxl.styles import Alignment
 
-# --- CSVから stock_codes_list.py を生成する関数 ---
-def update_stock_codes_list_file(csv_file_path):
-    output_filename = "stock_codes_list.py"
-    try:
-        df = pd.read_csv(csv_file_path, header=None)
-        stock_codes = df[0].astype(str).tolist()
-        print(f"\n{csv_file_path} から {len(stock_codes)} 件の銘柄コードを読み込みました。")
-        
-        with open(output_filename, 'w', encoding='utf-8') as f:
-            f.write("# stock_codes_list.py\n")
-            f.write(f"# Generated by main.py on {datetime.date.today()}\n")
-            f.write("STOCK_CODES_LIST = [\n")
-            for code in stock_codes:
-                f.write(f'    "{code.strip()}",\n')
-            f.write("]\n")
-        
-        print(f"★★★ 成功: {output_filename} を更新しました。 ★★★")
-        return True
-        
-    except FileNotFoundError:
-        print(f"エラー: CSVファイル '{csv_file_path}' が見つかりません。")
-        return False
-    except Exception as e:
-        print(f"CSV読み込みエラー: {e}")
-        return False
+import report_writer
+import code_lists
 
 # --- メイン処理 ---
 def main():
@@ -43,11 +18,17 @@ def main():
 
     csv_file_to_load = sys.argv[1]
     
-    if not update_stock_codes_list_file(csv_file_to_load):
+    # リストは直接メモリに読み込む (表記をそろえ、重複は除く)
+    try:
+        codes = code_lists.load_codes(csv_file_to_load)
+    except FileNotFoundError as e:
+        print(f"エラー: {e}")
+        return
+    except Exception as e:
+        print(f"リスト読み込みエラー: {e}")
         return
 
     try:
-        import stock_codes_list
         import yfinance_client
         import data_processor
     except ImportError as e:
@@ -56,7 +37,6 @@ def main():
 
     print("=== ASEAN株 財務データ取得システム (Yahoo Finance版) ===")
     
-    codes = stock_codes_list.STOCK_CODES_LIST
     print(f"取得対象: {len(codes)} 銘柄")
     
     all_results = []
@@ -168,40 +148,8 @@ def main():
             counter += 1
             
         try:
-            # 1. 保存
-            df.to_excel(filename, index=False)
-            
-            # 2. 書式設定
-            wb = load_workbook(filename)
-            ws = wb.active
-            right_align = Alignment(horizontal='right')
-            
-            for cell in ws[1]:
-                col_name = str(cell.value)
-                col_idx = cell.column
-                number_format = None
-                apply_alignment = False
-                
-                # ★★★ 修正箇所: マイナスをカッコ表示に設定 ★★★
-                if "('000)" in col_name:
-                    # カンマ区切り + マイナスはカッコ表示 (例: (1,234))
-                    number_format = '#,##0;(#,##0)'
-                    apply_alignment = True
-                elif "(%)" in col_name or "%" in col_name:
-                    number_format = '0.00%'
-                    apply_alignment = True
-                elif col_name == "FY":
-                    apply_alignment = True
-                
-                if number_format or apply_alignment:
-                    for row in ws.iter_rows(min_row=2, min_col=col_idx, max_col=col_idx):
-                        for cell in row:
-                            if apply_alignment:
-                                cell.alignment = right_align
-                            if number_format:
-                                cell.number_format = number_format
-            
-            wb.save(filename)
+            # 書式付きで1回だけ書き込む (ヘッダーの塗りつぶしなし)
+            report_writer.write_report(df, filename, header_color=None)
             print(f"★★★ 成功: {filename} に保存しました (千単位・カッコ表示・Market列追加) ★★★")
             
         except Exception as e:
@@ -1,105 +0,0 @@
-# stock_codes_list.py
-# Generated by main.py on 2025-12-15
-STOCK_CODES_LIST = [
-    "4863.KL",
-    "6012.KL",
-    "6947.KL",
-    "5162.KL",
-    "5031.KL",
-    "0138.KL",
-    "0082.KL",
-    "5028.KL",
-    "0021.KL",
-    "4456.KL",
-    "9008.KL",
-    "0010.KL",
-    "5216.KL",
-    "5204.KL",
-    "0126.KL",
-    "5011.KL",
-    "0119.KL",
-    "0176.KL",
-    "0022.KL",
-    "0060.KL",
-    "0024.KL",
-    "5036.KL",
-    "0008.KL",
-    "0117.KL",
-    "0039.KL",
-    "0032.KL",
-    "0108.KL",
-    "0147.KL",
-    "0040.KL",
-    "0023.KL",
-    "0018.KL",
-    "0140.KL",
-    "0131.KL",
-    "0056.KL",
-    "0034.KL",
-    "0111.KL",
-    "9075.KL",
-    "5195.KL",
-    "0202.KL",
-    "0006.KL",
-    "0029.KL",
-    "0132.KL",
-    "0017.KL",
-    "0107.KL",
-    "0026.KL",
-    "0123.KL",
-    "0007.KL",
-    "7031.KL",
-    "0145.KL",
-    "0191.KL",
-    "0096.KL",
-    "0036.KL",
-    "9393.KL",
-    "8338.KL",
-    "0200.KL",
-    "0203.KL",
-    "0051.KL",
-    "0005.KL",
-    "0050.KL",
-    "0103.KL",
-    "0129.KL",
-    "0154.KL",
-    "0155.KL",
-    "0143.KL",
-    "6888.KL",
-    "0065.KL",
-    "0174.KL",
-    "0106.KL",
-    "4359.KL",
-    "0092.KL",
-    "0020.KL",
-    "0079.KL",
-    "0156.KL",
-    "0041.KL",
-    "0094.KL",
-    "0075.KL",
-    "0081.KL",
-    "0152.KL",
-    "0068.KL",
-    "0118.KL",
-    "7195.KL",
-    "0064.KL",
-    "0086.KL",
-    "0085.KL",
-    "0169.KL",
-    "0045.KL",
-    "03011.KL",
-    "03001.KL",
-    "03030.KL",
-    "03022.KL",
-    "03002.KL",
-    "03008.KL",
-    "03020.KL",
-    "03046.KL",
-    "03036.KL",
-    "03057.KL",
-    "0013.KL",
-    "0009.KL",
-    "9377.KL",
-    "0141.KL",
-    "0122.KL",
-]
@@ -3,9 +3,7 @@ import pandas as pd
 import time
 import io
 import os
-from datetime import datetime, timedelta
-from openpyxl import load_workbook
-from openpyxl.styles import PatternFill, Font, Alignment
+from datetime import datetime
 from dotenv import load_dotenv # 追加
 
 # .envファイルを読み込む
@@ -13,6 +11,7 @@ load_dotenv()
 
 # Import existing logic
 import data_processor
+import report_writer
 
 # Page config
 st.set_page_config(page_title="ASEAN Stock Analyzer", layout="wide")
@@ -95,15 +94,22 @@ if st.button("Start Analysis 🚀"):
             status_text = st.empty()
             progress_bar = st.progress(0)
             
-            all_results = []
+            fetched = []
             for i, code in enumerate(codes):
                 code = code.strip()
                 status_text.text(f"Processing ({i+1}/{len(codes)}): {code}...")
                 progress_bar.progress((i + 1) / (len(codes) + 1))
-                raw_data = data_processor.get_stock_data(code)
+                fetched.append((code, data_processor.get_stock_data(code)))
+                time.sleep(0.2)
+
+            # 終値と為替レートを全銘柄まとめて1回で取得
+            status_text.text("💱 Fetching closing prices & exchange rates...")
+            snapshot = data_processor.load_price_snapshot(fetched)
+
+            all_results = []
+            for code, raw_data in fetched:
                 if raw_data:
                     all_results.append(data_processor.extract_data(code, raw_data))
-                time.sleep(0.2)
             
             if all_results:
                 status_text.text("🤖 Running AI Analysis...")
@@ -111,6 +117,7 @@ if st.button("Start Analysis 🚀"):
                 
                 df = pd.DataFrame(all_results)
                 df = clean_duplicate_columns(df, "DataFrame作成直後")
+                df = snapshot.apply(df)
                 
                 status_text.text("📏 Formatting data...")
                 df = data_processor.format_for_excel(df)
@@ -123,10 +130,9 @@ if st.button("Start Analysis 🚀"):
                         df[col] = ""
                 df["Listed 'o' / Non Listed \"x\""] = "o"
 
-                yesterday = datetime.now() - timedelta(days=1)
-                yesterday_str = yesterday.strftime("%b %d")
-                final_stock_price_col = f"Stock Price ({yesterday_str}, Closing)"
-                final_rate_col = f"Exchange Rate (to SGD) ({yesterday_str}, Closing)"
+                as_of_label = snapshot.label()
+                final_stock_price_col = f"Stock Price ({as_of_label})"
+                final_rate_col = f"Exchange Rate (to SGD) ({as_of_label})"
                 
                 df = clean_duplicate_columns(df, "リネーム直前")
                 rename_dict = {}
@@ -154,19 +160,8 @@ if st.button("Start Analysis 🚀"):
                 df = df.reindex(columns=target_order)
 
                 status_text.text("💾 Generating Excel file...")
-                temp_buffer = io.BytesIO()
-                df.to_excel(temp_buffer, index=False)
-                temp_buffer.seek(0)
-                
-                wb = load_workbook(temp_buffer)
-                ws = wb.active
-                header_fill = PatternFill(start_color="fefe99", end_color="fefe99", fill_type="solid")
-                for cell in ws[1]:
-                    cell.fill = header_fill
-                    cell.font = Font(bold=True)
-                
                 final_buffer = io.BytesIO()
-                wb.save(final_buffer)
+                report_writer.write_report(df, final_buffer, header_color="fefe99")
                 
                 st.session_state.excel_buffer = final_buffer.getvalue()
                 st.session_state.final_df = df
@@ -7,6 +7,10 @@ import os
 from google import genai
 from dotenv import load_dotenv
 
+import yahoo_cache
+import fx_rates
+import price_snapshot
+
 load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
@@ -92,19 +96,21 @@ def get_stock_data(code):
     try:
         ticker = yf.Ticker(code)
         try:
-            info = ticker.info
+            info = yahoo_cache.cached_fetch(code, "info", lambda: ticker.info)
         except:
             return None
             
         if not info:
             return None
 
+        # 財務諸表は次の決算期末までキャッシュを使う
+        statement_expiry = yahoo_cache.statement_expiry(info.get('lastFiscalYearEnd'))
         raw_data = {
             "info": info,
-            "balance_sheet": ticker.balance_sheet,
-            "financials": ticker.financials,
-            "major_holders": ticker.major_holders,
-            "institutional_holders": ticker.institutional_holders
+            "balance_sheet": yahoo_cache.cached_fetch(code, "balance_sheet", lambda: ticker.balance_sheet, statement_expiry),
+            "financials": yahoo_cache.cached_fetch(code, "financials", lambda: ticker.financials, statement_expiry),
+            "major_holders": yahoo_cache.cached_fetch(code, "major_holders", lambda: ticker.major_holders),
+            "institutional_holders": yahoo_cache.cached_fetch(code, "institutional_holders", lambda: ticker.institutional_holders)
         }
         return raw_data
     except Exception as e:
@@ -112,38 +118,48 @@ def get_stock_data(code):
         return None
 
 # ★変更: 為替レートも「前日終値」を優先取得
+# 実行中に使う為替レート表 (通貨ペアごとに1回だけ取得してメモ化)
+fx_table = fx_rates.FxRateTable(use_previous_close=True)
+
+def get_display_currency(info):
+    """info から表示用の通貨名を決める (extract_data と同じルール)"""
+    raw_currency = info.get('financialCurrency')
+    if not raw_currency:
+        raw_currency = info.get('currency', 'SGD')
+    if raw_currency == 'CNY':
+        return 'RMB (CNY)'
+    return raw_currency
+
+def prefetch_exchange_rates(raw_data_list):
+    """
+    取得済みの全銘柄から通貨を集め、必要な為替ペアをまとめて1回で取得する。
+    extract_data より前に呼ぶと、会社ごとの為替取得が発生しない。
+    """
+    currencies = {get_display_currency(raw.get("info") or {}) for raw in raw_data_list if raw}
+    fx_table.prefetch(currencies)
+
+def load_price_snapshot(fetched):
+    """
+    全銘柄の終値と為替ペアを1回の一括ダウンロードで取得し、取引所ごとの基準日を決める。
+    為替レート表にも同じ基準日のレートを登録するので、prefetch_exchange_rates は不要になる。
+    fetched: [(code, raw_data), ...]
+    """
+    codes = [code for code, raw in fetched if raw]
+    currencies = {get_display_currency(raw.get("info") or {}) for _, raw in fetched if raw}
+    snapshot = price_snapshot.PriceSnapshot().load(codes, currencies)
+    fx_table.seed(snapshot.exchange_rates())
+    # 一括取得で取れなかった通貨だけ個別に取得する
+    fx_table.prefetch(currencies)
+    return snapshot
+
 def get_exchange_rate(from_currency):
     """
     指定された通貨からSGDへの為替レート (SGD/外貨) を取得します。
-    整合性を保つため、株価と同様に 'previousClose' を優先します。
+    整合性を保つため、株価と同様に前日終値を優先します。
     """
     if not from_currency or from_currency == "SGD":
         return 1.0
-    
-    if from_currency == "RMB (CNY)":
-        currency_code = "CNY"
-    else:
-        currency_code = from_currency
-
-    pair = f"{currency_code}SGD=X"
-    
-    try:
-        ticker = yf.Ticker(pair)
-        
-        # 1. まず info から previousClose (前日終値) を取得
-        rate = ticker.info.get('previousClose')
-        
-        # 2. 取れなければ履歴データの最新終値で代用
-        if rate is None:
-            hist = ticker.history(period="5d")
-            if not hist.empty:
-                rate = hist['Close'].iloc[-1]
-            else:
-                return "N/A"
-        
-        return rate
-    except:
-        return "N/A"
+    return fx_table.get_rate(from_currency)
 
 
 # --- 3. データの整形・抽出 ---
@@ -317,13 +333,7 @@ def extract_data(code, raw_data):
     industry = info.get('industry')
     
     # 通貨情報の取得と整形
-    raw_currency = info.get('financialCurrency')
-    if not raw_currency:
-        raw_currency = info.get('currency', 'SGD') 
-        
-    display_currency = raw_currency
-    if display_currency == 'CNY':
-        display_currency = 'RMB (CNY)'
+    display_currency = get_display_currency(info)
     
     # 為替レートの取得 (前日終値)
     exchange_rate = get_exchange_rate(display_currency)
@@ -342,7 +352,8 @@ def extract_data(code, raw_data):
         else:
             market = "Main/Other"
     
-    # ★変更: 株価は「前日終値 (previousClose)」を使用する
+    # 株価は「前日終値 (previousClose)」を仮に入れる
+    # (PriceSnapshot.apply で取引所ごとの基準日の終値に置き換える)
     current_price = info.get('previousClose')
     # 取れない場合は現在値で代用
     if current_price is None:
@@ -0,0 +1,86 @@
+# fx_rates.py
+# 1回の実行で使う為替レート表 (外貨 -> SGD)
+# 必要な通貨ペアをまとめて1回の history ダウンロードで取得し、実行中はメモ化する
+import datetime
+import threading
+import pandas as pd
+import yfinance as yf
+
+BASE_CURRENCY = "SGD"
+
+
+def normalize_currency(currency):
+    """表示用の通貨名をYahooの通貨コードに戻す (取得できないものは None)"""
+    if not currency or currency == "N/A":
+        return None
+    if currency == "RMB (CNY)":
+        return "CNY"
+    return str(currency)
+
+
+class FxRateTable:
+    """
+    通貨コード -> SGDレート のメモ化テーブル
+    use_previous_close=True の場合は当日分を除いた「前日終値」を使う
+    """
+
+    def __init__(self, base_currency=BASE_CURRENCY, use_previous_close=False):
+        self.base_currency = base_currency
+        self.use_previous_close = use_previous_close
+        self._rates = {base_currency: 1.0}
+        self._lock = threading.Lock()
+
+    def pair_symbol(self, currency):
+        return f"{currency}{self.base_currency}=X"
+
+    def prefetch(self, currencies):
+        """未取得の通貨ペアをまとめて1回のダウンロードで取得する"""
+        with self._lock:
+            wanted = sorted({c for c in map(normalize_currency, currencies) if c} - set(self._rates))
+            if not wanted:
+                return
+
+            symbols = [self.pair_symbol(c) for c in wanted]
+            print(f"為替レートを一括取得中: {', '.join(symbols)} ...")
+            try:
+                hist = yf.download(symbols, period="5d", progress=False, auto_adjust=False)
+                closes = hist["Close"]
+                if isinstance(closes, pd.Series):
+                    closes = closes.to_frame(symbols[0])
+            except Exception as e:
+                print(f"  為替レート取得エラー: {e}")
+                closes = pd.DataFrame()
+
+            # 取得できなかったペアも "N/A" として記録し、同じ実行内で再取得しない
+            for currency, symbol in zip(wanted, symbols):
+                self._rates[currency] = self._pick_close(closes, symbol)
+
+    def seed(self, rates):
+        """他で一括取得したレート {通貨: レート} を登録する (登録済みの通貨はダウンロードしない)"""
+        with self._lock:
+            for currency, rate in rates.items():
+                currency_code = normalize_currency(currency)
+                if currency_code:
+                    self._rates[currency_code] = rate
+
+    def _pick_close(self, closes, symbol):
+        if symbol not in closes.columns:
+            return "N/A"
+        series = closes[symbol].dropna()
+        if self.use_previous_close:
+            today = datetime.date.today()
+            previous = series[[d.date() < today for d in series.index]]
+            if not previous.empty:
+                series = previous
+        if series.empty:
+            return "N/A"
+        return float(series.iloc[-1])
+
+    def get_rate(self, currency):
+        """通貨 -> SGD レートを返す (未取得ならその通貨だけ取得する)"""
+        currency_code = normalize_currency(currency)
+        if currency_code is None:
+            return "N/A"
+        if currency_code not in self._rates:
+            self.prefetch([currency_code])
+        return self._rates.get(currency_code, "N/A")
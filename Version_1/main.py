@@ -3,10 +3,9 @@ import datetime
 from pathlib import Path
 import sys
 import time
-from openpyxl import load_workbook
-from openpyxl.styles import Alignment, PatternFill, Font
 
 import data_processor
+import report_writer
 
 def main():
     if len(sys.argv) < 2:
@@ -30,12 +29,19 @@ def main():
     
     all_results = []
 
+    fetched = []
     for code in codes:
         code = code.strip()
+        print(f"\n--- {code} のデータ取得中 ---")
+        fetched.append((code, data_processor.get_stock_data(code)))
+        time.sleep(0.5)
+
+    # 全銘柄の終値と為替を1回で取得し、取引所ごとの基準日をそろえる
+    snapshot = data_processor.load_price_snapshot(fetched)
+
+    for code, raw_data in fetched:
         print(f"\n--- {code} の処理中 ---")
         
-        raw_data = data_processor.get_stock_data(code)
-        
         if raw_data:
             processed_data = data_processor.extract_data(code, raw_data)
             all_results.append(processed_data)
@@ -43,8 +49,6 @@ def main():
             print(f"  売上高: {processed_data.get('REVENUE')}")
         else:
             print("  データの取得に失敗しました。")
-        
-        time.sleep(0.5)
 
     if all_results:
         print("\n--- 全データ取得完了。AIによるセグメント分析を開始します ---")
@@ -56,6 +60,8 @@ def main():
         
         # 重複列の削除
         df = df.loc[:, ~df.columns.duplicated()]
+        # 株価・時価総額・為替を基準日の終値で列ごとに置き換える
+        df = snapshot.apply(df)
         df = data_processor.format_for_excel(df)
         
         if "Sector /Industry" in df.columns:
@@ -73,18 +79,16 @@ def main():
         
         df["Listed 'o' / Non Listed \"x\""] = "o"
 
-        # ★変更: 前日の日付を計算して表示する
-        # 現在日時から1日引く
-        yesterday = datetime.datetime.now() - datetime.timedelta(days=1)
-        yesterday_str = yesterday.strftime("%b %d") # 例: Dec 28
+        # 列名には実際の基準日を入れる (例: Dec 26, Closing)
+        as_of_label = snapshot.label()
         
-        # 株価カラム名: (Dec 28, Closing)
-        final_stock_price_col = f"Stock Price ({yesterday_str}, Closing)"
+        # 株価カラム名: (Dec 26, Closing)
+        final_stock_price_col = f"Stock Price ({as_of_label})"
         if "Stock Price" in df.columns:
             df = df.rename(columns={"Stock Price": final_stock_price_col})
             
-        # 為替レートカラム名: (Dec 28, Closing)
-        final_rate_col = f"Exchange Rate (to SGD) ({yesterday_str}, Closing)"
+        # 為替レートカラム名: (Dec 26, Closing)
+        final_rate_col = f"Exchange Rate (to SGD) ({as_of_label})"
         if "Exchange Rate" in df.columns:
             df = df.rename(columns={"Exchange Rate": final_rate_col})
 
@@ -128,49 +132,8 @@ def main():
             counter += 1
             
         try:
-            df.to_excel(filename, index=False)
-            
-            wb = load_workbook(filename)
-            ws = wb.active
-            right_align = Alignment(horizontal='right')
-            
-            # 背景色: #fefe99
-            header_fill = PatternFill(start_color="fefe99", end_color="fefe99", fill_type="solid")
-            header_font = Font(bold=True)
-
-            for cell in ws[1]:
-                col_name = str(cell.value)
-                col_idx = cell.column
-                cell.fill = header_fill
-                cell.font = header_font
-                
-                number_format = None
-                apply_alignment = False
-                
-                if "('000)" in col_name:
-                    number_format = '#,##0;(#,##0)'
-                    apply_alignment = True
-                elif "(%)" in col_name or "%" in col_name:
-                    number_format = '0.00%'
-                    apply_alignment = True
-                elif col_name == "FY":
-                    apply_alignment = True
-                elif "Stock Price" in col_name:
-                    number_format = '#,##0.000'
-                    apply_alignment = True
-                elif "Exchange Rate" in col_name:
-                    number_format = '0.0000'
-                    apply_alignment = True
-                
-                if number_format or apply_alignment:
-                    for row in ws.iter_rows(min_row=2, min_col=col_idx, max_col=col_idx):
-                        for cell_data in row:
-                            if apply_alignment:
-                                cell_data.alignment = right_align
-                            if number_format:
-                                cell_data.number_format = number_format
-            
-            wb.save(filename)
+            # 書式付きで1回だけ書き込む (背景色: #fefe99)
+            report_writer.write_report(df, filename, header_color="fefe99")
             print(f"★★★ 成功: {filename} に保存しました ★★★")
             
         except Exception as e:
@@ -0,0 +1,138 @@
+# price_snapshot.py
+# 全銘柄の終値と為替ペアを1回の一括ダウンロードで取得し、
+# 取引所ごとに1つの「基準日 (as-of)」を決めて株価・時価総額・為替レートをそろえる
+import datetime
+import pandas as pd
+import yfinance as yf
+
+import fx_rates
+
+# 祝日や連休をまたいでも基準日が見つかるよう、少し長めに取る
+HISTORY_PERIOD = "10d"
+# 取引所の銘柄のうち、この割合以上に終値がある日を「取引日」とみなす
+MIN_TRADED_RATIO = 0.5
+
+
+def exchange_of(code):
+    """銘柄コードのサフィックス (.SI, .KL など) を取引所のキーにする"""
+    code = str(code)
+    return code.rsplit(".", 1)[1].upper() if "." in code else "US"
+
+
+class PriceSnapshot:
+    """
+    終値のスナップショット。
+    load() で銘柄と為替ペアをまとめて取得し、取引所ごとの基準日を決める。
+    当日はまだ終値が確定していないので、基準日は前日以前の取引日から選ぶ。
+    """
+
+    def __init__(self, base_currency=fx_rates.BASE_CURRENCY):
+        self.base_currency = base_currency
+        self.closes = pd.DataFrame()
+        self.as_of = {}  # 取引所 -> 基準日 (datetime.date)
+        self.prices = pd.Series(dtype=float)  # 銘柄 -> 基準日の終値
+        self.currencies = []
+
+    def pair_symbol(self, currency):
+        return f"{currency}{self.base_currency}=X"
+
+    def load(self, codes, currencies=()):
+        """銘柄の終値と為替ペアを1回の yf.download で取得する"""
+        codes = list(dict.fromkeys(str(c).strip() for c in codes if c))
+        currencies = sorted({c for c in map(fx_rates.normalize_currency, currencies) if c} - {self.base_currency})
+        self.currencies = currencies
+        symbols = codes + [self.pair_symbol(c) for c in currencies]
+        if not symbols:
+            return self
+
+        print(f"終値を一括取得中: {len(codes)} 銘柄 + 為替 {len(currencies)} ペア ...")
+        try:
+            hist = yf.download(symbols, period=HISTORY_PERIOD, progress=False, auto_adjust=False, threads=True)
+            closes = hist["Close"]
+            if isinstance(closes, pd.Series):
+                closes = closes.to_frame(symbols[0])
+        except Exception as e:
+            print(f"  終値の取得エラー: {e}")
+            closes = pd.DataFrame()
+
+        # 当日分 (未確定) を除き、日付だけのインデックスにする
+        today = datetime.date.today()
+        closes.index = [pd.Timestamp(d).date() for d in closes.index]
+        self.closes = closes[[d < today for d in closes.index]].sort_index()
+
+        prices = {}
+        for exchange in sorted({exchange_of(c) for c in codes}):
+            columns = [c for c in codes if exchange_of(c) == exchange and c in self.closes.columns]
+            self.as_of[exchange] = self._pick_as_of(columns)
+            print(f"  {exchange}: 基準日 {self.as_of[exchange] or 'N/A'}")
+            prices.update(self._closes_on(columns, self.as_of[exchange]))
+        self.prices = pd.Series(prices, dtype=float)
+        return self
+
+    def _pick_as_of(self, columns):
+        """その取引所の銘柄の多くに終値がある最後の日を基準日にする"""
+        if not columns:
+            return None
+        counts = self.closes[columns].notna().sum(axis=1)
+        traded = counts[counts >= max(1, counts.max() * MIN_TRADED_RATIO)]
+        return traded.index[-1] if not traded.empty else None
+
+    def _closes_on(self, symbols, as_of):
+        """基準日以前の最後の終値 (その日に取引がなかった銘柄は直近の終値) を {symbol: 終値} で返す"""
+        symbols = [s for s in symbols if s in self.closes.columns]
+        if as_of is None or not symbols:
+            return {}
+        upto = self.closes.loc[[d <= as_of for d in self.closes.index], symbols]
+        if upto.empty:
+            return {}
+        return upto.ffill().iloc[-1].dropna().astype(float).to_dict()
+
+    def exchange_rates(self, as_of=None):
+        """
+        通貨 -> SGDレート (as_of 省略時は全取引所で最も新しい基準日の終値)。
+        FxRateTable.seed に渡せば、為替を別途ダウンロードしなくて済む。
+        """
+        if as_of is None:
+            as_of = max((d for d in self.as_of.values() if d), default=None)
+        pairs = {self.pair_symbol(c): c for c in self.currencies}
+        return {pairs[s]: rate for s, rate in self._closes_on(list(pairs), as_of).items()}
+
+    def label(self):
+        """列名用の基準日表記 (例: "Dec 26, Closing" / "SI Dec 26 / KL Dec 24, Closing")"""
+        dates = {ex: d for ex, d in self.as_of.items() if d}
+        if not dates:
+            return "Closing"
+        if len(set(dates.values())) == 1:
+            return f"{next(iter(dates.values())).strftime('%b %d')}, Closing"
+        parts = [f"{ex} {d.strftime('%b %d')}" for ex, d in sorted(dates.items())]
+        return f"{' / '.join(parts)}, Closing"
+
+    def apply(self, df, price_col="Stock Price", rate_col="Exchange Rate"):
+        """
+        extract_data の結果 (DataFrame) の株価・時価総額・為替レートを、
+        各銘柄の取引所の基準日の値で列ごとにまとめて置き換える。
+        終値が無い銘柄は元の値 (info の前日終値) を残す。
+        """
+        if df.empty or "Code" not in df.columns:
+            return df
+
+        codes = df["Code"].astype(str).str.strip()
+        exchanges = codes.map(exchange_of)
+        closes = pd.to_numeric(codes.map(self.prices), errors="coerce")
+
+        if price_col in df.columns:
+            df[price_col] = closes.fillna(pd.to_numeric(df[price_col], errors="coerce"))
+        if "Shares Outstanding" in df.columns and "Market Cap" in df.columns:
+            shares = pd.to_numeric(df["Shares Outstanding"], errors="coerce")
+            df["Market Cap"] = (closes * shares).fillna(pd.to_numeric(df["Market Cap"], errors="coerce"))
+
+        if rate_col in df.columns and "Currency" in df.columns:
+            # 為替も銘柄の取引所と同じ基準日のレートを使う (取引所 x 通貨 の表から引く)
+            rate_table = {ex: self.exchange_rates(d) for ex, d in self.as_of.items()}
+            currencies = df["Currency"].map(fx_rates.normalize_currency)
+            rates = pd.Series([
+                1.0 if cur == self.base_currency else rate_table.get(ex, {}).get(cur)
+                for cur, ex in zip(currencies, exchanges)
+            ], index=df.index, dtype="object")
+            df[rate_col] = rates.where(rates.notna(), df[rate_col])
+        return df
@@ -0,0 +1,101 @@
+# report_writer.py
+# DataFrame を書式付きの Excel に1回の書き込みで保存する共通ライター
+# (to_excel → load_workbook → 再保存 の二度手間をなくす)
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, PatternFill, Font, Border, Side
+
+# 列名から決まる数値書式
+FORMAT_THOUSANDS = '#,##0;(#,##0)'  # カンマ区切り + マイナスはカッコ表示
+FORMAT_PERCENT = '0.00%'
+FORMAT_STOCK_PRICE = '#,##0.000'
+FORMAT_EXCHANGE_RATE = '0.0000'
+
+RIGHT_ALIGN = Alignment(horizontal='right')
+
+# ヘッダーは pandas の to_excel と同じ見た目 (太字・中央寄せ・罫線)
+HEADER_FONT = Font(bold=True)
+HEADER_ALIGN = Alignment(horizontal='center', vertical='top')
+_thin = Side(style='thin')
+HEADER_BORDER = Border(left=_thin, right=_thin, top=_thin, bottom=_thin)
+
+
+def column_format(col_name):
+    """
+    列名から (数値書式, 右寄せするか) を決める
+    """
+    col_name = str(col_name)
+    if "('000)" in col_name:
+        return FORMAT_THOUSANDS, True
+    if "(%)" in col_name or "%" in col_name:
+        return FORMAT_PERCENT, True
+    if col_name == "FY":
+        return None, True
+    if "Stock Price" in col_name:
+        return FORMAT_STOCK_PRICE, True
+    if "Exchange Rate" in col_name:
+        return FORMAT_EXCHANGE_RATE, True
+    return None, False
+
+
+def _cell_value(value):
+    """Excelに書けない値 (NaN, NaT, pd.NA) は空欄にする"""
+    if value is None:
+        return None
+    try:
+        if pd.isna(value):
+            return None
+    except (TypeError, ValueError):
+        pass
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    return value
+
+
+def write_report(df, output, header_color="FFFF00", sheet_name="Sheet1"):
+    """
+    DataFrame を書式付きで保存する。
+    output: ファイル名 または BytesIO
+    header_color: ヘッダーの背景色 (None なら塗りつぶしなし)
+    書式は列ごとに1回だけ決めて、行を流し込みながら付ける (write-only モード)。
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=sheet_name)
+
+    header_fill = None
+    if header_color:
+        header_fill = PatternFill(start_color=header_color, end_color=header_color, fill_type="solid")
+
+    # ヘッダー行
+    header_cells = []
+    for col in df.columns:
+        cell = WriteOnlyCell(ws, value=str(col))
+        cell.font = HEADER_FONT
+        cell.alignment = HEADER_ALIGN
+        cell.border = HEADER_BORDER
+        if header_fill:
+            cell.fill = header_fill
+        header_cells.append(cell)
+    ws.append(header_cells)
+
+    # 列ごとの書式を先に決めておく
+    col_formats = [column_format(col) for col in df.columns]
+
+    # データ行
+    for row in df.itertuples(index=False, name=None):
+        cells = []
+        for value, (number_format, right_align) in zip(row, col_formats):
+            value = _cell_value(value)
+            if number_format is None and not right_align:
+                cells.append(value)
+                continue
+            cell = WriteOnlyCell(ws, value=value)
+            if number_format:
+                cell.number_format = number_format
+            if right_align:
+                cell.alignment = RIGHT_ALIGN
+            cells.append(cell)
+        ws.append(cells)
+
+    wb.save(output)
@@ -1,59 +0,0 @@
-# asean_stock_codes.py
-# ASEAN主要6カ国の銘柄コードリスト
-
-ALL_ASEAN_CODES = [
-    # --- Singapore (SGX) : .SI ---
-    "D05.SI", "O39.SI", "U11.SI", "Z74.SI", "C52.SI", "C31.SI", "C09.SI", "C38U.SI", "A17U.SI", "C6L.SI",
-    "S68.SI", "S63.SI", "Y92.SI", "V03.SI", "S58.SI", "U96.SI", "ME8U.SI", "H78.SI", "J36.SI", "J37.SI",
-    "BS6.SI", "G13.SI", "T39.SI", "S51.SI", "M44U.SI", "F34.SI", "AJBU.SI", "BUOU.SI", "BN4.SI", "H02.SI",
-    "U14.SI", "M1GU.SI", "AWX.SI", "A68U.SI", "CJLU.SI", "OV8.SI", "C07.SI", "E5H.SI", "S59.SI", "S61.SI",
-    "Q0F.SI", "D01.SI", "O32.SI", "H18.SI", "UV1.SI", "T82U.SI", "ACV.SI", "AU8U.SI", "RW0U.SI", "A7RU.SI",
-    "MZH.SI", "EB5.SI", "P40U.SI", "K71U.SI", "1H2.SI", "H15.SI", "C2PU.SI", "LIW.SI", "F99.SI", "Z25.SI",
-    "CM1.SI", "BTOU.SI", "RF1U.SI", "G07.SI", "575.SI", "S20.SI", "T24.SI", "Q5T.SI", "A30.SI", "B2F.SI",
-    "S08.SI", "HMN.SI", "Y35.SI", "S07.SI", "40S.SI", "502.SI", "U10.SI", "J91U.SI", "H12.SI", "E9L.SI",
-    "BQC.SI", "40V.SI", "BBW.SI", "F9D.SI", "544.SI", "AWV.SI", "532.SI", "I07.SI", "5OC.SI", "5FX.SI",
-    "YYN.SI", "5G4.SI", "42F.SI", "V2Y.SI", "NXR.SI", "A31.SI", "BAI.SI", "Y3D.SI", "N01.SI", "Z77.SI",
-    "CC3.SI", "T41.SI", "585.SI", "F13.SI", "M03.SI", "AWZ.SI", "BDA.SI", "580.SI", "564.SI", "QZG.SI",
-    "AYV.SI", "5EF.SI", "AWG.SI", "BXE.SI", "5EB.SI", "C33.SI", "C76.SI", "BIX.SI", "E28.SI", "QS9.SI",
-    "G20.SI", "AYN.SI", "JLB.SI", "5GZ.SI", "1J4.SI", "J03.SI", "K29.SI", "M11.SI", "SJY.SI", "5DD.SI",
-    "5BI.SI", "BCY.SI", "I11.SI", "BHU.SI", "S69.SI", "S71.SI", "581.SI", "AWI.SI", "E27.SI", "5AB.SI",
-    "CYW.SI", "BN2.SI", "BDR.SI", "B49.SI",
-    "9402", "9407", "9471", "3775", "3808", "5579", "5241", "5039", "3849", "3739", # 日本の地方市場
-
-    # --- Malaysia (Bursa Malaysia) : .KL ---
-    "1155.KL", "1295.KL", "1023.KL", "5183.KL", "6033.KL", "4065.KL", "5819.KL", "6012.KL", "1066.KL",
-    "8869.KL", "5681.KL", "5225.KL", "2445.KL", "3182.KL", "5168.KL", "6947.KL", "4197.KL", "4715.KL",
-    "5347.KL", "4707.KL", "5148.KL", "6888.KL", "5099.KL", "7277.KL", "7084.KL", "5296.KL", "3816.KL",
-    "7153.KL", "5014.KL", "5246.KL", "5199.KL", "5285.KL", "7204.KL", "0240.KL", "0097.KL", "0166.KL",
-    "0128.KL", "5304.KL", "0208.KL", "0270.KL", "0083.KL", "5243.KL", "0012.KL", "7081.KL", "5202.KL",
-    "0026.KL", "5211.KL", "5012.KL", "5236.KL", "7106.KL", "7166.KL", "7160.KL", "5139.KL", "7113.KL",
-    "0255.KL", "0203.KL", "0163.KL", "0100.KL", "0278.KL", "0273.KL", "0263.KL", "0259.KL", "0257.KL",
-    "0253.KL", "0249.KL", "0248.KL", "0246.KL", "0245.KL", "0238.KL", "0237.KL", "0233.KL", "0231.KL",
-    "0228.KL", "0225.KL", "0223.KL", "0222.KL", "0219.KL", "0217.KL", "0214.KL", "0212.KL", "0210.KL",
-    "0209.KL", "0206.KL", "0205.KL", "0202.KL", "0201.KL", "0200.KL", "0199.KL", "0198.KL", "0197.KL",
-    "5168.KL", "5819.KL", "5681.KL", "1023.KL", "1066.KL", "1295.KL", "5183.KL", "6033.KL", "4065.KL",
-
-    # --- Thailand (SET) : .BK ---
-    "PTT.BK", "AOT.BK", "CPALL.BK", "ADVANC.BK", "SCB.BK", "KBANK.BK", "BDMS.BK", "GULF.BK",
-    "SCC.BK", "PTTEP.BK", "KTB.BK", "CPN.BK", "MINT.BK", "CRC.BK", "CPF.BK", "BBL.BK", "BH.BK",
-    "TRUE.BK", "TOP.BK", "IVL.BK", "LH.BK", "BEM.BK", "GPSC.BK", "EA.BK", "TU.BK", "HMPRO.BK",
-    "BGRIM.BK", "BTS.BK", "OR.BK", "INTUCH.BK", "EGCO.BK", "RATCH.BK", "CBG.BK", "OSP.BK",
-
-    # --- Indonesia (IDX) : .JK ---
-    "BBCA.JK", "BBRI.JK", "BMRI.JK", "BBNI.JK", "ASII.JK", "TLKM.JK", "UNVR.JK", "ICBP.JK",
-    "GOTO.JK", "ADRO.JK", "BYAN.JK", "KLBF.JK", "PGAS.JK", "SMGR.JK", "ANTM.JK", "INCO.JK",
-    "INDF.JK", "UNTR.JK", "BRPT.JK", "CPIN.JK", "TPIA.JK", "MDKA.JK", "INKP.JK", "TKIM.JK",
-    "AMRT.JK", "EMTK.JK", "ARTO.JK", "TOWR.JK", "BUKA.JK", "MTEL.JK", "HMSP.JK", "GGRM.JK",
-
-    # --- Philippines (PSE) : .PS ---
-    "SM.PS", "ALI.PS", "BDO.PS", "BPI.PS", "ICT.PS", "AC.PS", "JFC.PS", "SMPH.PS",
-    "MER.PS", "TEL.PS", "GLO.PS", "AEV.PS", "MBT.PS", "URC.PS", "EMI.PS", "DMC.PS",
-    "ACEN.PS", "AP.PS", "BLOOM.PS", "CNPF.PS", "JGS.PS", "LTG.PS", "MPI.PS", "NIKL.PS",
-    "PGOLD.PS", "RLC.PS", "RRHI.PS", "SCC.PS", "SECB.PS", "WLCON.PS",
-
-    # --- Vietnam (HOSE) : .VN ---
-    "VCB.VN", "VHM.VN", "VIC.VN", "VNM.VN", "GAS.VN", "BID.VN", "TCB.VN", "VPB.VN",
-    "CTG.VN", "HPG.VN", "MBB.VN", "MSN.VN", "FPT.VN", "MWG.VN", "GVR.VN", "SAB.VN",
-    "VRE.VN", "ACB.VN", "HDB.VN", "TPB.VN", "STB.VN", "VIB.VN", "SSB.VN", "EIB.VN",
-    "PLX.VN", "POW.VN", "VJC.VN", "PNJ.VN", "KDH.VN", "NVL.VN", "SSI.VN", "REE.VN"
-]
\ No newline at end of file
@@ -0,0 +1,76 @@
+# batch_packer.py
+# LLMに送るバッチを「件数」ではなく「トークン数の予算」で詰める
+# 短い概要文はたくさん、長い概要文は少なめに1リクエストへまとめる
+import math
+
+# 英語の概要文はおよそ4文字で1トークン (厳密でなくてよい)
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    """文字数からトークン数を大まかに見積もる"""
+    return math.ceil(len(str(text)) / CHARS_PER_TOKEN)
+
+
+class BatchPacker:
+    """
+    1件ずつ add() して、予算を超える直前でバッチを確定させる。
+      input_budget:  1リクエストの入力トークン数の上限 (共通の指示文を除く)
+      output_budget: 1リクエストの出力トークン数の上限 (応答時間と応答の途切れを抑える)
+      output_tokens_per_item: 1件あたりの出力トークン数の見積もり
+      max_items: 件数の上限 (None なら予算だけで決める)
+    予算より大きい1件は、その1件だけでバッチにする。
+    """
+
+    def __init__(self, item_text, input_budget, output_budget, output_tokens_per_item, max_items=None):
+        self.item_text = item_text
+        self.input_budget = input_budget
+        self.output_budget = output_budget
+        self.output_tokens_per_item = output_tokens_per_item
+        self.max_items = max_items
+        self._batch = []
+        self._input_tokens = 0
+        self._output_tokens = 0
+
+    def add(self, item):
+        """item を加える。これで確定したバッチがあれば返す (無ければ None)"""
+        input_tokens = estimate_tokens(self.item_text(item))
+        output_tokens = self.output_tokens_per_item
+
+        full = None
+        if self._batch and (
+            self._input_tokens + input_tokens > self.input_budget
+            or self._output_tokens + output_tokens > self.output_budget
+            or (self.max_items and len(self._batch) >= self.max_items)
+        ):
+            full = self.flush()
+
+        self._batch.append(item)
+        self._input_tokens += input_tokens
+        self._output_tokens += output_tokens
+        return full
+
+    def flush(self):
+        """詰めかけのバッチを確定させて返す (空なら None)"""
+        batch = self._batch or None
+        self._batch = []
+        self._input_tokens = 0
+        self._output_tokens = 0
+        return batch
+
+    def __len__(self):
+        return len(self._batch)
+
+
+def pack_batches(items, item_text, input_budget, output_budget, output_tokens_per_item, max_items=None):
+    """items を予算ごとのバッチ (リスト) に分けて返す (順番は保つ)"""
+    packer = BatchPacker(item_text, input_budget, output_budget, output_tokens_per_item, max_items)
+    batches = []
+    for item in items:
+        full = packer.add(item)
+        if full:
+            batches.append(full)
+    last = packer.flush()
+    if last:
+        batches.append(last)
+    return batches
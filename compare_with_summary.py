@@ -1,8 +1,7 @@
 import pandas as pd
-import yfinance as yf
+import yfinance_client
 import sys
 import os
-import time
 
 def load_codes(file_path):
     """CSVファイルを読み込んで、銘柄コードのセット(集合)を返す"""
@@ -20,11 +19,16 @@ def load_codes(file_path):
         print(f"エラー: '{file_path}' の読み込みに失敗しました。({e})")
         sys.exit(1)
 
+# 必要な項目は info だけで取れる (財務諸表などは取得しない)
+INFO_FIELDS = ("Name of Company", "Business Summary", "Industry", "Sector")
+
 def fetch_company_info(code):
     """Yahoo Financeから会社名と概要を取得する"""
     try:
-        ticker = yf.Ticker(code)
-        info = ticker.info
+        raw_data = yfinance_client.get_stock_data(code, fields=INFO_FIELDS)
+        if raw_data is None:
+            raise ValueError("データを取得できませんでした")
+        info = raw_data.get("info", {})
         return {
             "Code": code,
             "Name": info.get('longName', 'N/A'),
@@ -52,7 +56,6 @@ def process_list(code_list, source_name):
         print(f"[{i+1}/{total}] Fetching: {code} ...")
         info = fetch_company_info(code)
         data.append(info)
-        time.sleep(0.5) # 負荷軽減
         
     return pd.DataFrame(data)
 
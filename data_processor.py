@@ -1,12 +1,21 @@
 # data_processor.py
 import pandas as pd
+import numpy as np
 from datetime import datetime
 import os
-import time
-import json
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from google import genai
 from dotenv import load_dotenv
 
+import fx_rates
+import batch_packer
+import llm_cache
+import llm_dispatcher
+import llm_recovery
+import rate_limiter
+
 # .envファイルから環境変数を読み込む
 load_dotenv()
 
@@ -18,81 +27,255 @@ client = None
 if GEMINI_API_KEY:
     client = genai.Client(api_key=GEMINI_API_KEY)
 
+# セグメント分析に使うモデルとプロンプトのバージョン
+# (プロンプトを変更したらバージョンを上げて、古いキャッシュを使わないようにする)
+SEGMENT_MODEL_NAME = 'gemini-2.5-flash'
+SEGMENT_PROMPT_VERSION = "segments-v1"
+
+# Gemini呼び出しのリミッター (429を検知すると同時実行数を下げてバックオフ)
+GEMINI_REQUESTS_PER_SECOND = 1.0
+gemini_limiter = rate_limiter.get_limiter(
+    "gemini", max_concurrency=4, max_rate=GEMINI_REQUESTS_PER_SECOND
+)
+
+# AI分析結果のキャッシュ (概要文が変わらなければ再送しない)
+segment_cache = llm_cache.LLMResultCache()
+
+# 1リクエストに詰めるトークン数の予算 (件数ではなく概要文の長さで詰める)
+SEGMENT_SUMMARY_CHARS = 500
+SEGMENT_INPUT_TOKEN_BUDGET = 6000
+SEGMENT_OUTPUT_TOKEN_BUDGET = 2000
+SEGMENT_OUTPUT_TOKENS_PER_ITEM = 40
+
+def _segment_cache_key(item):
+    return llm_cache.make_key(SEGMENT_MODEL_NAME, SEGMENT_PROMPT_VERSION,
+                              item['Code'], str(item['Summary of Business']))
+
+def fill_segments_from_cache(items):
+    """
+    キャッシュにある銘柄はすぐに Segments を埋め、
+    AIに送る必要がある (キャッシュにない) 銘柄のリストを返す
+    """
+    misses = []
+    for item in items:
+        cached = segment_cache.get(_segment_cache_key(item))
+        if cached is not None:
+            item['Segments'] = cached
+        else:
+            misses.append(item)
+    return misses
+
+def _segment_item_text(item):
+    """プロンプトに入れる1社分のテキスト"""
+    summary_snippet = str(item['Summary of Business'])[:SEGMENT_SUMMARY_CHARS].replace("\n", " ")
+    return f"Code: {item['Code']}\nSummary: {summary_snippet}...\n---\n"
+
+def new_segment_packer():
+    return batch_packer.BatchPacker(
+        _segment_item_text, SEGMENT_INPUT_TOKEN_BUDGET,
+        SEGMENT_OUTPUT_TOKEN_BUDGET, SEGMENT_OUTPUT_TOKENS_PER_ITEM,
+    )
+
+# AI分析で結果が得られなかった銘柄の Segments (キャッシュはしない)
+SEGMENT_FAILED_TEXT = "N/A"
+
+def _request_segments(batch):
+    """1バッチ分の企業をまとめてGeminiに投げ、{code: segments} を返す (途中で切れたJSONも読める所まで)"""
+    input_text = "".join(_segment_item_text(item) for item in batch)
+
+    prompt = f"""
+    You are a financial analyst. I will provide business summaries for multiple companies.
+    Extract the main 'Business Segments' for EACH company based on the summary.
+
+    # Input Data
+    {input_text}
+    
+    # Output Rules
+    - Return ONLY a valid JSON object.
+    - The keys must be the stock 'Code'.
+    - The values must be the 'Business Segments' (comma separated string, clear and concise).
+    - If segments are not clearly stated, summarize the main business areas in 3-4 words.
+    - Example JSON Format:
+    {{
+        "4863.KL": "Telecommunication Services, Digital Solutions",
+        "0021.KL": "Payment Services, Solution Services"
+    }}
+    """
+
+    # モデルの RPM / TPM 予算が空くまで待つ (複数バッチを同時に送っても超えない)
+    llm_dispatcher.get_budget(SEGMENT_MODEL_NAME).acquire(
+        batch_packer.estimate_tokens(prompt) + SEGMENT_OUTPUT_TOKENS_PER_ITEM * len(batch)
+    )
+    # 429やタイムアウトはリミッターがバックオフして再試行する
+    response = gemini_limiter.call(
+        client.models.generate_content,
+        model=SEGMENT_MODEL_NAME,
+        contents=prompt
+    )
+    return llm_recovery.parse_json_object(response.text)
+
+def analyze_segment_batch(batch):
+    """
+    1バッチ分の企業をまとめてGeminiに投げ、Segments を埋める。
+    応答が壊れていた / 足りなかった銘柄は送り直し、それでも駄目なら "N/A" にする。
+    全件の結果が得られたら True を返す。
+    """
+    segments_map, failed = llm_recovery.run_with_recovery(
+        batch, _request_segments, lambda item: item['Code']
+    )
+    for item in batch:
+        code = item['Code']
+        if code in segments_map:
+            item['Segments'] = segments_map[code]
+            segment_cache.put(_segment_cache_key(item), segments_map[code])
+        else:
+            item['Segments'] = SEGMENT_FAILED_TEXT
+    segment_cache.save()
+    if failed:
+        print(f"  ⚠️ {len(failed)} 件はセグメントを取得できませんでした")
+    return not failed
+
 def batch_analyze_segments(all_results_list):
     """
     リストにある全企業のデータをまとめてGeminiに投げ、セグメントを抽出して埋める
     """
-    if not client:
-        print("  ⚠️ APIキー(.env)が見つからない、またはクライアント初期化失敗のため、AI分析をスキップします")
-        return all_results_list
-
     targets = [item for item in all_results_list if item.get('Summary of Business')]
     
     if not targets:
         return all_results_list
 
-    print(f"\n🤖 Gemini AI分析開始: 対象 {len(targets)} 件をまとめて処理します (バッチ処理)...")
-    
-    # バッチサイズ
-    batch_size = 20
-    
-    for i in range(0, len(targets), batch_size):
-        batch = targets[i : i + batch_size]
-        current_count = min(i + batch_size, len(targets))
-        print(f"  - バッチ処理中: {i+1}〜{current_count} 件目...")
-
-        input_text = ""
-        for item in batch:
-            summary_snippet = str(item['Summary of Business'])[:500].replace("\n", " ")
-            input_text += f"Code: {item['Code']}\nSummary: {summary_snippet}...\n---\n"
-
-        prompt = f"""
-        You are a financial analyst. I will provide business summaries for multiple companies.
-        Extract the main 'Business Segments' for EACH company based on the summary.
-
-        # Input Data
-        {input_text}
-        
-        # Output Rules
-        - Return ONLY a valid JSON object.
-        - The keys must be the stock 'Code'.
-        - The values must be the 'Business Segments' (comma separated string, clear and concise).
-        - If segments are not clearly stated, summarize the main business areas in 3-4 words.
-        - Example JSON Format:
-        {{
-            "4863.KL": "Telecommunication Services, Digital Solutions",
-            "0021.KL": "Payment Services, Solution Services"
-        }}
-        """
+    # キャッシュにある銘柄はすぐに埋めて、残りだけをAIに送る
+    misses = fill_segments_from_cache(targets)
+    print(f"  キャッシュ利用: {len(targets) - len(misses)} 件 / AI問い合わせ対象: {len(misses)} 件")
+    targets = misses
 
-        try:
-            response = client.models.generate_content(
-                model='gemini-2.5-flash',
-                contents=prompt
-            )
-            response_text = response.text.strip()
-            
-            # JSON部分だけを取り出す
-            if "```json" in response_text:
-                response_text = response_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in response_text:
-                response_text = response_text.split("```")[1].split("```")[0].strip()
-            
-            segments_map = json.loads(response_text)
+    if not targets:
+        print("✅ AI分析完了 (全件キャッシュ)\n")
+        return all_results_list
 
-            for item in batch:
-                code = item['Code']
-                if code in segments_map:
-                    item['Segments'] = segments_map[code]
-            
-            time.sleep(1)
+    if not client:
+        print("  ⚠️ APIキー(.env)が見つからない、またはクライアント初期化失敗のため、AI分析をスキップします")
+        return all_results_list
 
-        except Exception as e:
-            print(f"  ⚠️ バッチ処理エラー (このバッチはスキップします): {e}")
+    # トークン数の予算でバッチに分ける
+    batches = batch_packer.pack_batches(
+        targets, _segment_item_text, SEGMENT_INPUT_TOKEN_BUDGET,
+        SEGMENT_OUTPUT_TOKEN_BUDGET, SEGMENT_OUTPUT_TOKENS_PER_ITEM,
+    )
+    print(f"\n🤖 Gemini AI分析開始: 対象 {len(targets)} 件を {len(batches)} 回に分けて処理します (最大 {llm_dispatcher.MAX_IN_FLIGHT} 件同時)...")
+    
+    # 複数のバッチを同時に送り、終わった順に結果を各銘柄へ書き戻す
+    done = 0
+    for batch, result in llm_dispatcher.dispatch(batches, analyze_segment_batch):
+        done += len(batch)
+        if isinstance(result, Exception):
+            print(f"  ⚠️ バッチ処理エラー: {result}")
+        print(f"  - バッチ完了: {done}/{len(targets)} 件")
 
     print("✅ AI分析完了\n")
     return all_results_list
 
+class SegmentStreamAnalyzer:
+    """
+    データ取得と並行してセグメント分析を進めるためのバックグラウンド処理。
+    submit() で抽出済みのレコードを1件ずつ渡すと、トークン数の予算がいっぱいになった時点で
+    別スレッドがGeminiに送る。キューの長さに上限があるので、AIが追いつかない
+    場合は submit() が待つ (メモリを使いすぎない)。
+    最後に close() を呼ぶと、残りを送って全バッチの完了を待つ。
+    """
+
+    def __init__(self, max_pending_batches=2):
+        self._queue = queue.Queue(maxsize=max_pending_batches)
+        self._packer = new_segment_packer()
+        self._cache_hits = 0
+        self._sent = 0
+        self._warned_no_client = False
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def submit(self, item):
+        if not item or not item.get('Summary of Business'):
+            return
+        if not fill_segments_from_cache([item]):
+            self._cache_hits += 1
+            return
+        if not client:
+            if not self._warned_no_client:
+                print("  ⚠️ APIキー(.env)が見つからない、またはクライアント初期化失敗のため、AI分析をスキップします")
+                self._warned_no_client = True
+            return
+        full = self._packer.add(item)
+        if full:
+            self._queue.put(full)
+
+    def _flush(self):
+        batch = self._packer.flush()
+        if batch:
+            self._queue.put(batch)
+
+    def _run(self):
+        # 最大 MAX_IN_FLIGHT 個のバッチを同時に送る (RPM / TPM の予算は _request_segments で守る)
+        in_flight = threading.Semaphore(llm_dispatcher.MAX_IN_FLIGHT)
+
+        def analyze(batch):
+            try:
+                analyze_segment_batch(batch)
+            except Exception as e:
+                print(f"  ⚠️ バッチ処理エラー: {e}")
+            finally:
+                in_flight.release()
+
+        with ThreadPoolExecutor(max_workers=llm_dispatcher.MAX_IN_FLIGHT) as executor:
+            while True:
+                batch = self._queue.get()
+                if batch is None:
+                    break
+                in_flight.acquire()
+                print(f"  🤖 セグメント分析中: {len(batch)} 件 (送信済み {self._sent} 件)...")
+                self._sent += len(batch)
+                executor.submit(analyze, batch)
+
+    def close(self):
+        """残りのバッチを送り、全て終わるまで待つ"""
+        self._flush()
+        self._queue.put(None)
+        self._worker.join()
+        print(f"✅ AI分析完了 (キャッシュ利用: {self._cache_hits} 件 / AI問い合わせ: {self._sent} 件)\n")
+
+
+# 実行中に使う為替レート表 (通貨ペアごとに1回だけ取得してメモ化)
+fx_table = fx_rates.FxRateTable()
+
+def get_display_currency(info):
+    """info から表示用の通貨名を決める (決算通貨を優先)"""
+    currency = info.get('financialCurrency')
+    if not currency:
+        currency = info.get('currency', 'N/A')
+    if currency == 'CNY':
+        currency = 'RMB (CNY)'
+    return currency
+
+# 取得ループの前にまとめて取得しておく通貨 (ASEAN 6か国 + 決算でよく使われる USD)
+RUN_CURRENCIES = ("SGD", "MYR", "IDR", "THB", "VND", "PHP", "USD")
+
+def prefetch_run_exchange_rates(quotes=None):
+    """
+    取得ループの前に、ASEAN通貨と quote の通貨の為替ペアをまとめて1回で取得する。
+    銘柄を1件ずつ処理する場合も、通貨ごとの為替ダウンロードが起きない
+    (ここに無い決算通貨だけは extract_data の中で取得する)。
+    """
+    currencies = set(RUN_CURRENCIES)
+    currencies.update(q.get("currency") for q in (quotes or {}).values() if q and q.get("currency"))
+    fx_table.prefetch(currencies)
+
+def prefetch_exchange_rates(raw_data_list):
+    """
+    取得済みの全銘柄から通貨を集め、必要な為替ペアをまとめて1回で取得する。
+    extract_data より前に呼ぶと、会社ごとの為替取得が発生しない。
+    """
+    currencies = {get_display_currency(raw.get("info") or {}) for raw in raw_data_list if raw}
+    fx_table.prefetch(currencies)
+
 def format_shareholders(holders_data, data_type="institutional"):
     if holders_data is None or holders_data.empty:
         return None
@@ -161,23 +344,11 @@ def format_shareholders(holders_data, data_type="institutional"):
     return "\n".join(result_lines)
 
 
-def extract_data(code, raw_data):
-    info = raw_data.get("info", {})
-    bs = raw_data.get("balance_sheet")
-    inc = raw_data.get("financials")
-    
-    inst_holders = raw_data.get("institutional_holders")
-    major_holders = raw_data.get("major_holders")
-    
-    shareholder_text = "Not Available"
-    text_major = format_shareholders(major_holders, "major")
-    if text_major:
-        shareholder_text = text_major
-    else:
-        text_inst = format_shareholders(inst_holders, "institutional")
-        if text_inst:
-            shareholder_text = text_inst
-
+def calc_financials(bs, inc):
+    """
+    1銘柄分の balance_sheet / financials から財務指標を計算する
+    (最新期 = balance_sheet の先頭列, なければ financials の先頭列)
+    """
     latest_date = None
     if bs is not None and not bs.empty:
         latest_date = bs.columns[0]
@@ -235,6 +406,226 @@ def extract_data(code, raw_data):
     if total_equity and total_equity != 0 and loan is not None:
          loan_equity_ratio = (loan / total_equity)
 
+    return {
+        "revenue": revenue,
+        "profit": profit,
+        "gross_profit": gross_profit,
+        "operating_income": operating_income,
+        "net_profit_group": net_profit_group,
+        "net_profit_owners": net_profit_owners,
+        "minority_interest": minority_interest,
+        "stockholders_equity": stockholders_equity,
+        "total_equity": total_equity,
+        "total_assets": total_assets,
+        "debt_equity_ratio": debt_equity_ratio,
+        "loan": loan,
+        "loan_equity_ratio": loan_equity_ratio,
+    }
+
+
+# --- 全銘柄まとめての財務指標計算 (ベクトル化) ---
+# calc_financials と同じ項目・同じフォールバック規則を列演算で行う
+FINANCIAL_ITEMS = {
+    "financials": [
+        "Total Revenue", "Pretax Income", "Operating Income", "Gross Profit",
+        "Net Income", "Net Income Common Stock",
+        "Net Income Including Noncontrolling Interests", "Net Income Continuous Operations",
+    ],
+    "balance_sheet": [
+        "Minority Interest", "Stockholders Equity", "Total Assets",
+        "Total Equity Gross Minority Interest",
+        "Current Debt", "Long Term Debt", "Total Debt", "Capital Lease Obligations",
+    ],
+}
+
+def stack_statements(fetched):
+    """
+    全銘柄の balance_sheet / financials から、最新期の FINANCIAL_ITEMS だけを1つの表にまとめる。
+    fetched: [(code, raw_data), ...] (raw_data が None の銘柄は除外)
+    戻り値: (values, present)
+      values:  行 = fetched 内の位置, 列 = (statement, item) の数値 (float)
+      present: 同じ形の bool 表 (その項目が最新期の列に存在したか)
+    最新期は calc_financials と同じ (balance_sheet の先頭列, なければ financials の先頭列)。
+    """
+    columns = [(st, item) for st, items in FINANCIAL_ITEMS.items() for item in items]
+    rows = []
+    cells = []
+    found = []
+
+    for row, (code, raw_data) in enumerate(fetched):
+        if not raw_data:
+            continue
+        bs = raw_data.get("balance_sheet")
+        inc = raw_data.get("financials")
+
+        latest_date = None
+        if bs is not None and not bs.empty:
+            latest_date = bs.columns[0]
+        elif inc is not None and not inc.empty:
+            latest_date = inc.columns[0]
+
+        row_cells = []
+        row_found = []
+        frames = {"balance_sheet": bs, "financials": inc}
+        for statement, items in FINANCIAL_ITEMS.items():
+            df = frames[statement]
+            latest = None
+            if df is not None and not df.empty and latest_date is not None:
+                periods = df.columns.tolist()
+                if latest_date in periods:
+                    latest = df.to_numpy()[:, periods.index(latest_date)]
+            if latest is None:
+                row_cells.extend([np.nan] * len(items))
+                row_found.extend([False] * len(items))
+                continue
+            # 最新期の列から必要な項目だけを取り出す (同じ項目が重複している場合は先頭を使う)
+            # pandas の reindex を銘柄ごとに呼ぶと遅いので、行番号の辞書で引く
+            names = df.index.tolist()
+            first = dict(zip(reversed(names), range(len(names) - 1, -1, -1)))
+            for item in items:
+                i = first.get(item)
+                row_cells.append(np.nan if i is None else latest[i])
+                row_found.append(i is not None)
+        rows.append(row)
+        cells.append(row_cells)
+        found.append(row_found)
+
+    index = pd.MultiIndex.from_tuples(columns, names=["statement", "item"])
+    values = pd.DataFrame(cells, index=rows, columns=index).apply(pd.to_numeric, errors="coerce").astype(float)
+    present = pd.DataFrame(found, index=rows, columns=index, dtype=bool)
+    return values, present
+
+def calc_financials_bulk(fetched):
+    """
+    全銘柄の財務指標をまとめて計算する (calc_financials と同じ結果)。
+    戻り値は fetched と同じ順番のリスト (raw_data が None の位置は None)。
+    """
+    values, present = stack_statements(fetched)
+    rows = list(values.index)
+    if not rows:
+        return [None] * len(fetched)
+
+    def col(statement, item):
+        # 項目が無い銘柄は 0 (値が NaN の場合は NaN のまま)
+        key = (statement, item)
+        if key not in values.columns:
+            return pd.Series(0.0, index=rows)
+        return values[key].where(present[key], 0.0)
+
+    revenue = col("financials", "Total Revenue")
+    pretax_income = col("financials", "Pretax Income")
+    operating_income = col("financials", "Operating Income")
+    gross_profit = col("financials", "Gross Profit")
+    profit = pretax_income.where(pretax_income != 0, operating_income)
+
+    net_income = col("financials", "Net Income")
+    net_profit_owners = net_income.where(net_income != 0, col("financials", "Net Income Common Stock"))
+
+    group_incl_nci = col("financials", "Net Income Including Noncontrolling Interests")
+    net_profit_group = group_incl_nci.where(group_incl_nci != 0, col("financials", "Net Income Continuous Operations"))
+    net_profit_group = net_profit_group.where(~((net_profit_group == 0) & (net_profit_owners != 0)), net_profit_owners)
+
+    minority_interest = col("balance_sheet", "Minority Interest")
+    stockholders_equity = col("balance_sheet", "Stockholders Equity")
+    total_assets = col("balance_sheet", "Total Assets")
+    total_equity = col("balance_sheet", "Total Equity Gross Minority Interest")
+    total_equity = total_equity.where(
+        ~((total_equity == 0) & (stockholders_equity != 0)), stockholders_equity + minority_interest
+    )
+
+    total_debt = col("balance_sheet", "Total Debt")
+    capital_lease = col("balance_sheet", "Capital Lease Obligations")
+    loan = total_debt.where(
+        ~((total_debt != 0) & (capital_lease != 0) & (total_debt > capital_lease)), total_debt - capital_lease
+    )
+    loan = loan.where(loan != 0, col("balance_sheet", "Current Debt") + col("balance_sheet", "Long Term Debt"))
+
+    # 比率は計算できない場合 None (calc_financials と同じ)
+    equity_ok = total_equity != 0
+    debt_equity_ratio = ((total_assets - total_equity) / total_equity).astype(object)
+    debt_equity_ratio = debt_equity_ratio.where(equity_ok & (total_assets != 0), None)
+    loan_equity_ratio = (loan / total_equity).astype(object).where(equity_ok, None)
+
+    table = pd.DataFrame({
+        "revenue": revenue,
+        "profit": profit,
+        "gross_profit": gross_profit,
+        "operating_income": operating_income,
+        "net_profit_group": net_profit_group,
+        "net_profit_owners": net_profit_owners,
+        "minority_interest": minority_interest,
+        "stockholders_equity": stockholders_equity,
+        "total_equity": total_equity,
+        "total_assets": total_assets,
+        "debt_equity_ratio": debt_equity_ratio,
+        "loan": loan,
+        "loan_equity_ratio": loan_equity_ratio,
+    })
+    records = dict(zip(rows, table.to_dict("records")))
+    return [records.get(i) for i in range(len(fetched))]
+
+def extract_data_bulk(fetched, quotes=None):
+    """
+    extract_data の一括版。財務指標は calc_financials_bulk でまとめて計算する。
+    quotes: yfinance_client.fetch_quotes の結果 (株価・時価総額をこちらで上書き)
+    戻り値は fetched と同じ順番のリスト (取得失敗の位置は None)。
+    """
+    print(f"財務指標を一括計算しています ({len(fetched)} 銘柄)...")
+    all_financials = calc_financials_bulk(fetched)
+    quotes = quotes or {}
+    return [
+        extract_data(code, raw_data, fin, quotes.get(code)) if raw_data else None
+        for (code, raw_data), fin in zip(fetched, all_financials)
+    ]
+
+
+def quote_price_fields(quote):
+    """quote API の結果から (株価, 発行株数, 時価総額) を取り出す"""
+    price = quote.get('regularMarketPrice')
+    if price is None:
+        price = quote.get('regularMarketPreviousClose')
+    return price, quote.get('sharesOutstanding'), quote.get('marketCap')
+
+
+def extract_data(code, raw_data, financials=None, quote=None):
+    """
+    取得した生データからExcel用の1行分のデータを作る。
+    financials: calc_financials_bulk で計算済みの指標 (省略時はこの銘柄だけで計算)
+    quote: fetch_quotes で一括取得した株価データ (あれば info の株価より優先)
+    """
+    info = raw_data.get("info", {})
+    bs = raw_data.get("balance_sheet")
+    inc = raw_data.get("financials")
+    
+    major_holders = raw_data.get("major_holders")
+    
+    shareholder_text = "Not Available"
+    text_major = format_shareholders(major_holders, "major")
+    if text_major:
+        shareholder_text = text_major
+    else:
+        # 機関投資家は主要株主が取れない時だけ読む (遅延取得の場合はここで取得される)
+        inst_holders = raw_data.get("institutional_holders")
+        text_inst = format_shareholders(inst_holders, "institutional")
+        if text_inst:
+            shareholder_text = text_inst
+
+    if financials is None:
+        financials = calc_financials(bs, inc)
+    revenue = financials["revenue"]
+    profit = financials["profit"]
+    gross_profit = financials["gross_profit"]
+    operating_income = financials["operating_income"]
+    net_profit_group = financials["net_profit_group"]
+    net_profit_owners = financials["net_profit_owners"]
+    minority_interest = financials["minority_interest"]
+    stockholders_equity = financials["stockholders_equity"]
+    total_equity = financials["total_equity"]
+    total_assets = financials["total_assets"]
+    debt_equity_ratio = financials["debt_equity_ratio"]
+    loan = financials["loan"]
+    loan_equity_ratio = financials["loan_equity_ratio"]
+
     fy_date = None
     if info.get('lastFiscalYearEnd'):
         try:
@@ -261,11 +652,9 @@ def extract_data(code, raw_data):
 
     sector = info.get('sector')
     industry = info.get('industry')
-    currency = info.get('financialCurrency')
-    if not currency:
-        currency = info.get('currency', 'N/A')
-    if currency == 'CNY':
-        currency = 'RMB (CNY)'
+    currency = get_display_currency(info)
+    # 売上高をSGD換算するためのレート (決算通貨 -> SGD)
+    exchange_rate = fx_table.get_rate(currency)
     website = info.get('website', '')
     
     market = info.get('exchange', 'Unknown')
@@ -288,6 +677,12 @@ def extract_data(code, raw_data):
     shares_outstanding = info.get('sharesOutstanding')
     market_cap = info.get('marketCap')
 
+    if quote:
+        q_price, q_shares, q_cap = quote_price_fields(quote)
+        current_price = q_price if q_price is not None else current_price
+        shares_outstanding = q_shares if q_shares is not None else shares_outstanding
+        market_cap = q_cap if q_cap is not None else market_cap
+
     # 現在日時を取得 (英語形式: Dec 29 09:00)
     now_str = datetime.now().strftime("%b %d %H:%M")
     stock_price_col_name = f"Stock Price ({now_str})"
@@ -296,6 +691,7 @@ def extract_data(code, raw_data):
         "Name of Company": info.get('longName'),
         "Code": code,
         "Currency": currency,
+        "Exchange Rate (to SGD)": exchange_rate,
         "Website": website,
         "Major Shareholders": shareholder_text,
         "FY": fy_date,
@@ -332,6 +728,78 @@ def extract_data(code, raw_data):
     return result
 
 
+def unify_stock_price_column(records):
+    """
+    株価の列名には取得時刻が入るため、ジャーナルから再開した場合などに
+    列が複数に分かれないよう、最初のレコードの列名にそろえる (その場で書き換える)
+    """
+    target_name = None
+    for record in records:
+        price_keys = [k for k in record if str(k).startswith("Stock Price")]
+        if not price_keys:
+            continue
+        if target_name is None:
+            target_name = price_keys[0]
+            continue
+        if price_keys[0] != target_name:
+            renamed = {(target_name if k == price_keys[0] else k): v for k, v in record.items()}
+            record.clear()
+            record.update(renamed)
+    return records
+
+
+def refresh_volatile_fields(record, quote):
+    """
+    前回抽出したレコードの株価・発行株数・時価総額だけを quote で更新した新しいレコードを返す。
+    財務項目などはそのまま (quote が無ければ元のレコードのコピー)。
+    """
+    if not quote:
+        return dict(record)
+    price, shares, market_cap = quote_price_fields(quote)
+    stock_price_col_name = f"Stock Price ({datetime.now().strftime('%b %d %H:%M')})"
+
+    refreshed = {}
+    for key, value in record.items():
+        if str(key).startswith("Stock Price"):
+            refreshed[stock_price_col_name] = price if price is not None else value
+        else:
+            refreshed[key] = value
+    if shares is not None:
+        refreshed["Shares Outstanding"] = shares
+    if market_cap is not None:
+        refreshed["Market Cap"] = market_cap
+    return refreshed
+
+
+def refresh_report_prices(df, quotes):
+    """
+    既存レポート (format_for_excel 済みの DataFrame) の株価・発行株数・時価総額だけを
+    quotes で更新する。財務項目には触れない。株価の列名は現在時刻で付け直す。
+    """
+    price_col = next((c for c in df.columns if str(c).startswith("Stock Price")), None)
+    now_str = datetime.now().strftime("%b %d %H:%M")
+    new_price_col = f"Stock Price ({now_str})"
+
+    updated = 0
+    for idx, code in df["Code"].items():
+        quote = quotes.get(str(code).strip())
+        if not quote:
+            continue
+        price, shares, market_cap = quote_price_fields(quote)
+        if price_col and price is not None:
+            df.at[idx, price_col] = price
+        if "Shares Outstanding ('000)" in df.columns and shares is not None:
+            df.at[idx, "Shares Outstanding ('000)"] = shares / 1000.0
+        if "Market Cap ('000)" in df.columns and market_cap is not None:
+            df.at[idx, "Market Cap ('000)"] = market_cap / 1000.0
+        updated += 1
+
+    if price_col:
+        df = df.rename(columns={price_col: new_price_col})
+    print(f"株価を更新しました: {updated} / {len(df)} 銘柄")
+    return df
+
+
 def format_for_excel(df):
     """
     Excel出力用に整形
@@ -356,6 +824,19 @@ def format_for_excel(df):
             df[col] = pd.to_numeric(df[col], errors='coerce')
             df[col] = df[col] / divisor
 
+    # 売上高は決算通貨からSGDに換算する
+    # (レートが取れない銘柄は決算通貨のまま残し、レートを N/A にして銘柄を表示する)
+    if 'REVENUE' in df.columns and 'Exchange Rate (to SGD)' in df.columns:
+        print("売上高をSGDに換算しています...")
+        rates = pd.to_numeric(df['Exchange Rate (to SGD)'], errors='coerce')
+        df['REVENUE'] = df['REVENUE'].where(rates.isna(), df['REVENUE'] * rates)
+        df['Exchange Rate (to SGD)'] = df['Exchange Rate (to SGD)'].where(rates.notna(), 'N/A')
+        unconverted = rates.isna() & df['REVENUE'].notna()
+        if unconverted.any():
+            codes = df.loc[unconverted, 'Code'] if 'Code' in df.columns else df.index[unconverted]
+            print(f"  ⚠️ 為替レートが無いため、売上高を決算通貨のまま出力します ({unconverted.sum()} 銘柄): "
+                  f"{', '.join(str(c) for c in codes)}")
+
     pct_cols = ["Debt/Equity(%)", "Loan/Equity (%)"]
     for col in pct_cols:
          if col in df.columns:
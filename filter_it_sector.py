@@ -1,8 +1,12 @@
 import pandas as pd
-import yfinance as yf
+import yfinance_client
+import batch_packer
+import llm_cache
+import llm_dispatcher
+import llm_recovery
+import it_preclassifier
+import rate_limiter
 import os
-import time
-import json
 import google.generativeai as genai
 from dotenv import load_dotenv
 from openpyxl import Workbook
@@ -18,15 +22,60 @@ else:
     print("Error: GEMINI_API_KEY is not set in the .env file.")
     exit()
 
-# 2. 銘柄リストのインポート
-try:
-    import asean_stock_codes
-    ALL_CODES = asean_stock_codes.ALL_ASEAN_CODES
-except ImportError:
-    print("Warning: asean_stock_codes.py not found. Using a test list.")
-    ALL_CODES = ["D05.SI", "Z74.SI", "4863.KL", "0021.KL"] 
+# 2. 銘柄リスト (登録簿 asean_universe.csv, 初めて使う時に読み込む)
+import universe
+TEST_CODES = ["D05.SI", "Z74.SI", "4863.KL", "0021.KL"]
 
-# 3. 高精度プロンプト (完全英語)
+def load_universe_codes(country=None):
+    """登録簿から対象国の銘柄を取り出す (country=None なら全件)"""
+    try:
+        registry = universe.get_universe()
+        return list(registry.codes) if country is None else list(registry.by_country(country))
+    except FileNotFoundError:
+        print("Warning: asean_universe.csv not found. Using a test list.")
+        return TEST_CODES
+
+# 3. 判定に使うモデルとプロンプトのバージョン
+# (プロンプトを変更したらバージョンを上げて、古いキャッシュを使わないようにする)
+IT_MODEL_NAME = 'gemini-2.5-flash'
+IT_PROMPT_VERSION = "it-judge-v1"
+
+# Gemini呼び出しのリミッター (429を検知すると同時実行数を下げてバックオフ)
+GEMINI_REQUESTS_PER_SECOND = 0.5
+gemini_limiter = rate_limiter.get_limiter(
+    "gemini", max_concurrency=4, max_rate=GEMINI_REQUESTS_PER_SECOND
+)
+
+# 判定結果のキャッシュ (概要文が変わらなければ再判定しない)
+judgement_cache = llm_cache.LLMResultCache()
+
+# 1リクエストに詰めるトークン数の予算 (件数ではなく概要文の長さで詰める)
+IT_SUMMARY_CHARS = 800
+IT_INPUT_TOKEN_BUDGET = 12000
+IT_OUTPUT_TOKEN_BUDGET = 4000
+IT_OUTPUT_TOKENS_PER_ITEM = 80
+
+# 明らかな Yes / No (銀行, REIT, ソフトウェア会社など) はGeminiに送らずローカルで判定する
+USE_PRECLASSIFIER = True
+SOURCE_GEMINI = "Gemini"
+
+# 段階判定 (使う場合は環境変数 IT_TIERED_MODE=1):
+# まず安くて速いモデルで全件を判定し、Grey や判定とカテゴリーが食い違う結果だけを
+# 強いモデルに長めの概要文で聞き直す。既定の IT_MODEL_NAME (gemini-2.5-flash) の代わりに
+# flash-lite と pro を使うので、Grey が多いと pro の呼び出し分だけ費用が増える。
+# 無効 (既定) なら IT_MODEL_NAME だけで判定する。
+IT_TIERED_MODE = os.getenv("IT_TIERED_MODE", "0") == "1"
+IT_TIERS = (
+    {"name": "Fast", "model": "gemini-2.5-flash-lite", "summary_chars": IT_SUMMARY_CHARS},
+    {"name": "Strong", "model": "gemini-2.5-pro", "summary_chars": 2500},
+)
+IT_SINGLE_TIER = {"name": "Standard", "model": IT_MODEL_NAME, "summary_chars": IT_SUMMARY_CHARS}
+TIER_LOCAL = "Local"
+
+# Yes の時に使われるカテゴリー
+IT_CATEGORIES = ("Software", "IT Services", "Hardware", "Telecom")
+
+# 4. 高精度プロンプト (完全英語)
 IT_JUDGEMENT_PROMPT = """
 You are a financial analyst specializing in technology sector classification.
 Your task is to analyze the provided 'Summary of Business' for multiple companies and determine if they qualify as an **"IT-related Company"** based on the strict criteria below.
@@ -60,6 +109,9 @@ The values must be an object with: "verdict", "category", and "reason".
 }
 """
 
+# 概要文と前判定に使う項目 (info だけを取得する)
+SUMMARY_FIELDS = ("Name of Company", "Business Summary", "Sector", "Industry")
+
 def fetch_summaries(codes):
     """Yahoo FinanceからSummaryを取得する"""
     data_list = []
@@ -68,8 +120,10 @@ def fetch_summaries(codes):
     for i, code in enumerate(codes):
         print(f"\rFetching data: {i+1}/{len(codes)} ({code})", end="")
         try:
-            ticker = yf.Ticker(code)
-            info = ticker.info
+            raw_data = yfinance_client.get_stock_data(code, fields=SUMMARY_FIELDS)
+            if raw_data is None:
+                continue
+            info = raw_data.get("info", {})
             summary = info.get('longBusinessSummary', '')
             name = info.get('longName', code)
             
@@ -77,84 +131,188 @@ def fetch_summaries(codes):
                 data_list.append({
                     "code": code,
                     "name": name,
-                    "summary": summary
+                    "summary": summary,
+                    # ローカルの前判定に使う
+                    "sector": info.get('sector', ''),
+                    "industry": info.get('industry', '')
                 })
         except Exception:
             pass
     print("\nData fetch complete.")
     return data_list
 
-def batch_judge_it_sector(targets):
-    """LLMにまとめて投げて判定させる（リトライ機能付き）"""
-    
-    all_results = [] # Yes/No/Grey すべて格納するリスト
-    batch_size = 50  # まとめて送る数
+def _it_item_text(item, summary_chars=IT_SUMMARY_CHARS):
+    """プロンプトに入れる1社分のテキスト"""
+    s = item['summary'][:summary_chars].replace("\n", " ")
+    return f"Code: {item['code']}\nSummary: {s}...\n---\n"
+
+# AIの判定が得られなかった銘柄に付ける理由
+FAILED_REASON = "No AI verdict (request failed) - please review manually."
+
+def _request_judgements(model, model_name, batch, summary_chars=IT_SUMMARY_CHARS):
+    """1バッチ分の企業を判定させ、{code: {"verdict", "category", "reason"}} を返す"""
+    input_data_text = "".join(_it_item_text(item, summary_chars) for item in batch)
+    full_prompt = f"""
+    {IT_JUDGEMENT_PROMPT}
+
+    ### TARGET COMPANIES DATA
+    {input_data_text}
+    """
+    # モデルの RPM / TPM 予算が空くまで待つ (複数バッチを同時に送っても超えない)
+    llm_dispatcher.get_budget(model_name).acquire(
+        batch_packer.estimate_tokens(full_prompt) + IT_OUTPUT_TOKENS_PER_ITEM * len(batch)
+    )
+    # 429やタイムアウトはリミッターがバックオフして再試行する
+    response = gemini_limiter.call(model.generate_content, full_prompt)
+    return llm_recovery.parse_json_object(response.text)
+
+def _is_inconsistent(res):
+    """判定とカテゴリーが食い違っている結果か (強いモデルに聞き直す)
+    理由の文面は言い回しが多様なので見ない"""
+    verdict = res["verdict"]
+    if verdict == "Yes":
+        # Yes なのにIT系のカテゴリーでない
+        return res["category"] not in IT_CATEGORIES
+    if verdict == "No":
+        # No なのにIT系のカテゴリー
+        return res["category"] in IT_CATEGORIES
+    return verdict != "Grey"
+
+def _needs_escalation(res):
+    return res["verdict"] == "Grey" or _is_inconsistent(res)
+
+def _judge_tier(targets, tier):
+    """1つの段 (モデル + 概要文の長さ) で判定し、{code: {"verdict", "category", "reason"}} を返す
+    (判定できなかった銘柄は含まない)"""
+    model_name = tier["model"]
+    summary_chars = tier["summary_chars"]
+    results = {}
+
+    # キャッシュにある銘柄はすぐに結果へ入れて、残りだけをAIに送る
+    cache_keys = {}
+    misses = []
+    for item in targets:
+        key = llm_cache.make_key(model_name, IT_PROMPT_VERSION, item['code'], item['summary'])
+        cached = judgement_cache.get(key)
+        if cached is not None:
+            results[item['code']] = cached
+        else:
+            cache_keys[item['code']] = key
+            misses.append(item)
+
+    print(f"\n[{tier['name']}] {model_name} - Cache hits: {len(targets) - len(misses)} / Sent to AI: {len(misses)}")
+    targets = misses
     
-    model = genai.GenerativeModel('gemini-2.5-flash') 
+    model = genai.GenerativeModel(model_name) 
     
     print(f"\nStarting AI Analysis: Analyzing {len(targets)} companies...")
     
-    for i in range(0, len(targets), batch_size):
-        batch = targets[i : i + batch_size]
-        print(f"  - Analyzing batch: {i+1} to {min(i+batch_size, len(targets))}...")
-        
-        # 入力データの作成
-        input_data_text = ""
+    # トークン数の予算でバッチに分ける (短い概要文ほど1回に多く詰める)
+    item_text = lambda item: _it_item_text(item, summary_chars)
+    batches = batch_packer.pack_batches(
+        targets, item_text, IT_INPUT_TOKEN_BUDGET, IT_OUTPUT_TOKEN_BUDGET, IT_OUTPUT_TOKENS_PER_ITEM
+    )
+    print(f"Packed into {len(batches)} requests.")
+
+    def judge(batch):
+        return llm_recovery.run_with_recovery(
+            batch, lambda part: _request_judgements(model, model_name, part, summary_chars), lambda item: item['code']
+        )
+
+    # 複数のバッチを同時に送り、届いた順に各銘柄の結果を書き戻す
+    done = 0
+    for batch, outcome in llm_dispatcher.dispatch(batches, judge):
+        done += len(batch)
+        print(f"  - Batch finished: {done}/{len(targets)}")
+        if isinstance(outcome, Exception):
+            print(f"    ⚠️ Error in batch: {outcome}")
+            verdicts = {}
+        else:
+            verdicts, failed = outcome
+
+        # 成功したらデータを格納
         for item in batch:
-            s = item['summary'][:800].replace("\n", " ")
-            input_data_text += f"Code: {item['code']}\nSummary: {s}...\n---\n"
-            
-        full_prompt = f"""
-        {IT_JUDGEMENT_PROMPT}
+            code = item['code']
+            if code in verdicts:
+                res = verdicts[code] if isinstance(verdicts[code], dict) else {}
+                results[code] = {
+                    "verdict": res.get("verdict", "No"),
+                    "category": res.get("category", "N/A"),
+                    "reason": res.get("reason")
+                }
+                judgement_cache.put(cache_keys[code], results[code])
 
-        ### TARGET COMPANIES DATA
-        {input_data_text}
-        """
-        
-        # リトライロジック
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                # AI実行
-                response = model.generate_content(full_prompt)
-                clean_text = response.text.replace("```json", "").replace("```", "").strip()
-                result_json = json.loads(clean_text)
-                
-                # 成功したらデータを格納
-                for item in batch:
-                    code = item['code']
-                    if code in result_json:
-                        res = result_json[code]
-                        verdict = res.get("verdict", "No")
-                        category = res.get("category", "N/A")
-                        
-                        # ★変更点: Yesだけでなく、全ての結果をリストに追加する
-                        all_results.append({
-                            "Code": code,
-                            "Name": item['name'],
-                            "Verdict": verdict,
-                            "Category": category,
-                            "Reason": res.get("reason")
-                        })
-                        
-                        # ログ出力（Yesのときだけ目立たせる）
-                        if verdict == "Yes":
-                            print(f"    [HIT] {code}: {category}")
-                        # else:
-                        #     print(f"    [SKIP] {code}: {verdict}") # 必要ならコメントアウト解除
-                
-                time.sleep(2) 
-                break 
-
-            except Exception as e:
-                error_msg = str(e)
-                if "429" in error_msg or "quota" in error_msg.lower():
-                    wait_time = 30 
-                    print(f"    ⚠️ Rate limit exceeded. Waiting {wait_time} seconds before retrying... (Attempt {attempt+1}/{max_retries})")
-                    time.sleep(wait_time)
-                else:
-                    print(f"    ⚠️ Error in batch: {e}")
-                    break 
+                # ログ出力（Yesのときだけ目立たせる）
+                if results[code]["verdict"] == "Yes":
+                    print(f"    [HIT] {code}: {results[code]['category']}")
+        judgement_cache.save()
+
+    return results
+
+def batch_judge_it_sector(targets, preclassifier=None):
+    """LLMにまとめて投げて判定させる（リトライ機能付き）
+    preclassifier があれば、確信度の高い銘柄はローカルで判定してAIには送らない。
+    IT_TIERED_MODE では速いモデルで全件を判定し、Grey と判定・カテゴリーが食い違う結果だけを強いモデルに聞き直す。
+    各結果の Tier 列に、どの段の判定かを残す。"""
+    
+    all_results = [] # Yes/No/Grey すべて格納するリスト
+
+    if preclassifier is not None:
+        names = {item['code']: item['name'] for item in targets}
+        settled, targets = preclassifier.split(targets)
+        for code, res in settled.items():
+            all_results.append({
+                "Code": code,
+                "Name": names[code],
+                "Verdict": res["verdict"],
+                "Category": res["category"],
+                "Reason": res["reason"],
+                "Source": res["source"],
+                "Confidence": round(res["confidence"], 2),
+                "Tier": TIER_LOCAL
+            })
+        rules = sum(1 for res in settled.values() if res["source"] == it_preclassifier.SOURCE_RULES)
+        print(f"\nSettled locally: {len(settled)} (rules {rules}, TF-IDF {len(settled) - rules}) / Ambiguous: {len(targets)}")
+
+    # 段ごとに判定し、聞き直しが必要な銘柄だけを次の段へ回す
+    # (次の段で判定できなかった銘柄は、前の段の結果を残す)
+    tiers = IT_TIERS if IT_TIERED_MODE else (IT_SINGLE_TIER,)
+    final = {}
+    tried = {}
+    pending = targets
+    for level, tier in enumerate(tiers):
+        if not pending:
+            break
+        verdicts = _judge_tier(pending, tier)
+        escalate = []
+        for item in pending:
+            code = item['code']
+            tried[code] = tier["name"]
+            if code in verdicts:
+                final[code] = dict(verdicts[code], tier=tier["name"])
+            if level + 1 < len(tiers) and (code not in verdicts or _needs_escalation(verdicts[code])):
+                escalate.append(item)
+        if escalate:
+            print(f"\nEscalating {len(escalate)} companies to the {tiers[level + 1]['name']} tier ({tiers[level + 1]['model']})")
+        pending = escalate
+
+    # ★変更点: Yesだけでなく、全ての結果をリストに追加する
+    for item in targets:
+        code = item['code']
+        res = final.get(code)
+        if res is None:
+            # 判定できなかった銘柄も落とさず、要確認 (Grey) としてレポートに残す (キャッシュはしない)
+            res = {"verdict": "Grey", "category": "N/A", "reason": FAILED_REASON, "tier": tried.get(code)}
+        all_results.append({
+            "Code": code,
+            "Name": item['name'],
+            "Verdict": res["verdict"],
+            "Category": res["category"],
+            "Reason": res["reason"],
+            "Source": SOURCE_GEMINI,
+            "Confidence": None,
+            "Tier": res["tier"]
+        })
             
     return all_results
 
@@ -182,7 +340,7 @@ def save_to_excel(data_list, filename):
             cell.fill = header_fill
             
         # 列幅の設定
-        column_widths = {'A': 10, 'B': 35, 'C': 10, 'D': 20, 'E': 70}
+        column_widths = {'A': 10, 'B': 35, 'C': 10, 'D': 20, 'E': 70, 'F': 10, 'G': 12, 'H': 10}
         for col_char, width in column_widths.items():
             worksheet.column_dimensions[col_char].width = width
             
@@ -228,13 +386,12 @@ def main():
     }
     
     if target_country == "ALL":
-        target_codes = ALL_CODES
+        target_codes = load_universe_codes()
     elif target_country in suffix_map:
-        suffix = suffix_map[target_country]
-        target_codes = [c for c in ALL_CODES if c.endswith(suffix)]
+        target_codes = load_universe_codes(target_country)
     else:
         print("Searching all codes or specific suffix provided manually...")
-        target_codes = ALL_CODES
+        target_codes = load_universe_codes()
 
     # 2. Summary取得
     print("Retrieving Business Summaries from Yahoo Finance...")
@@ -244,10 +401,16 @@ def main():
         print("No business summaries retrieved.")
         return
 
-    # 3. AI判定 (全件取得)
-    all_results = batch_judge_it_sector(data_with_summary)
+    # 3. ローカルの前判定 (過去レポートがあれば TF-IDF モデルも学習する)
+    preclassifier = None
+    if USE_PRECLASSIFIER:
+        print("Preparing local pre-classifier...")
+        preclassifier = it_preclassifier.PreClassifier.from_reports(data_with_summary)
+
+    # 4. AI判定 (曖昧な銘柄のみ)
+    all_results = batch_judge_it_sector(data_with_summary, preclassifier)
     
-    # 4. ファイル保存
+    # 5. ファイル保存
     if all_results:
         date_str = pd.Timestamp.now().strftime('%Y%m%d')
         
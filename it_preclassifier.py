@@ -0,0 +1,251 @@
+# it_preclassifier.py
+# IT銘柄判定の前さばき (Geminiに送る前にローカルで判定する)
+# - Yahooのセクター/業種と概要文のキーワードで、明らかな Yes / No をその場で確定させる
+# - 過去の IT_Judgement_Report_*.xlsx の判定から TF-IDF モデルを学習して使うこともできる
+#   (scikit-learn が無い環境ではルールだけで判定する)
+# - どちらでも確信度が足りない銘柄だけを Gemini に送る
+import glob
+import re
+
+import pandas as pd
+
+# この確信度以上の判定だけをローカルで確定させる
+RULE_CONFIDENCE_THRESHOLD = 0.85
+# IT系の言葉が無いだけ (非IT系の言葉も無い) の No は閾値未満にして Gemini に任せる
+NO_KEYWORD_CONFIDENCE = 0.75
+MODEL_CONFIDENCE_THRESHOLD = 0.9
+
+# 過去レポートの場所と、学習に必要な最低件数 (Yes / No それぞれ)
+REPORT_PATTERN = "IT_Judgement_Report_*.xlsx"
+MIN_TRAINING_SAMPLES = 15
+
+SOURCE_RULES = "Rules"
+SOURCE_MODEL = "TF-IDF"
+# ローカルで確定した行は学習に使わない (自分の判定で学習し直すと誤りが固定される)
+LOCAL_SOURCES = (SOURCE_RULES, SOURCE_MODEL)
+
+# Yahooの業種 -> IT判定のカテゴリー (この業種で、概要文にもIT系の言葉があれば Yes)
+IT_INDUSTRIES = {
+    "Software - Application": "Software",
+    "Software - Infrastructure": "Software",
+    "Information Technology Services": "IT Services",
+    "Semiconductors": "Hardware",
+    "Semiconductor Equipment & Materials": "Hardware",
+    "Computer Hardware": "Hardware",
+    "Communication Equipment": "Hardware",
+    "Electronic Components": "Hardware",
+    "Telecom Services": "Telecom",
+}
+
+# IT系の業種を含まないセクター (概要文にIT系の言葉が1つも無ければ No)
+# Technology / Communication Services はメディアや太陽光なども含むため、ここには入れない
+NON_IT_SECTORS = {
+    "Financial Services", "Real Estate", "Utilities", "Energy", "Basic Materials",
+    "Consumer Defensive", "Consumer Cyclical", "Healthcare", "Industrials",
+}
+
+# 概要文のキーワード (小文字, 単語の先頭から一致)
+# IT系の言葉が1つでもあれば No にはしないので、IT系は広めに取る
+IT_KEYWORDS = (
+    "software", "saas", "cloud", "data cent", "semiconductor", "wafer", "integrated circuit",
+    "telecommunication", "telco", "broadband", "internet", "network", "router", "switches",
+    "cybersecurity", "cyber security", "information technology", "it services", "it solutions",
+    "it outsourcing", "it consult", "managed service", "outsourcing", "digital", "e-commerce",
+    "system integration", "systems integration", "systems integrator", "erp", "crm",
+    "enterprise application", "artificial intelligence", "machine learning", "iot", "internet of things",
+    "fibre", "fiber", "mobile", "wireless", "satellite", "printed circuit", "electronic", "computer",
+    "server", "hardware", "data analytics", "analytics", "automation", "online",
+    "technology solutions", "health information", "blockchain", "5g",
+)
+# 銀行などの「ITを使っているだけ」の言い回しは、IT系の言葉として数えない
+IT_USER_PHRASES = (
+    "internet banking", "online banking", "mobile banking", "digital banking", "digital bank",
+    "online trading", "mobile app", "online booking", "online sales",
+)
+NON_IT_KEYWORDS = (
+    "bank", "plantation", "palm oil", "oil palm", "real estate investment trust", "reit",
+    "insurance", "property development", "hotel", "restaurant", "mining", "coal",
+    "shipping", "construction", "poultry", "rubber", "hospital",
+)
+
+
+def _keyword_pattern(words):
+    return re.compile(r"\b(" + "|".join(re.escape(w) for w in words) + r")", re.IGNORECASE)
+
+
+_IT_PATTERN = _keyword_pattern(IT_KEYWORDS)
+_IT_USER_PATTERN = _keyword_pattern(IT_USER_PHRASES)
+_NON_IT_PATTERN = _keyword_pattern(NON_IT_KEYWORDS)
+
+
+def _hits(pattern, text):
+    """一致したキーワード (重複なし, 出てきた順)"""
+    return list(dict.fromkeys(m.lower() for m in pattern.findall(text or "")))
+
+
+def classify_by_rules(item):
+    """
+    セクター/業種と概要文のキーワードで判定する。
+    item: {"code", "summary", "sector", "industry"}
+    戻り値: {"verdict", "category", "reason", "confidence"} (判断材料が無ければ verdict は Grey)
+    """
+    sector = item.get("sector") or ""
+    industry = item.get("industry") or ""
+    it_hits = _hits(_IT_PATTERN, _IT_USER_PATTERN.sub(" ", item.get("summary") or ""))
+    non_it_hits = _hits(_NON_IT_PATTERN, item.get("summary"))
+    label = f"'{industry or 'N/A'}' ({sector or 'N/A'})"
+
+    if industry in IT_INDUSTRIES and it_hits:
+        if non_it_hits:
+            # IT業種だが他の事業も書かれている -> Geminiに任せる
+            confidence = 0.7
+        else:
+            confidence = min(0.9 + 0.03 * (len(it_hits) - 1), 0.96)
+        return {
+            "verdict": "Yes",
+            "category": IT_INDUSTRIES[industry],
+            "reason": f"Local rule: Yahoo industry {label}; IT keywords in summary: {', '.join(it_hits[:3])}.",
+            "confidence": confidence,
+        }
+
+    if sector in NON_IT_SECTORS and not it_hits:
+        # 非IT系の言葉がある時だけ確定させる (IT系の言葉が無いだけでは、言い回しの漏れで No にしてしまう)
+        confidence = 0.97 if non_it_hits else NO_KEYWORD_CONFIDENCE
+        detail = f"; non-IT keywords: {', '.join(non_it_hits[:3])}" if non_it_hits else ""
+        return {
+            "verdict": "No",
+            "category": "N/A",
+            "reason": f"Local rule: Yahoo industry {label}; no IT keywords in summary{detail}.",
+            "confidence": confidence,
+        }
+
+    return {"verdict": "Grey", "category": "N/A", "reason": "", "confidence": 0.0}
+
+
+def load_past_verdicts(pattern=REPORT_PATTERN):
+    """
+    過去の判定レポートから Gemini が判定した行だけを {code: {"verdict", "category", "reason"}} で読む。
+    Source 列が Rules / TF-IDF の行 (この前判定で確定した行) は除く。Source 列の無い古いレポートは全行 Gemini の判定。
+    同じ銘柄が複数のレポートにあれば、ファイル名 (日付) が新しい方を使う。
+    """
+    verdicts = {}
+    for path in sorted(glob.glob(pattern)):
+        try:
+            df = pd.read_excel(path)
+        except Exception as e:
+            print(f"  ⚠️ 過去レポートを読めませんでした: {path} ({e})")
+            continue
+        for row in df.to_dict("records"):
+            code = str(row.get("Code") or "").strip()
+            if code and row.get("Source") not in LOCAL_SOURCES:
+                verdicts[code] = {
+                    "verdict": row.get("Verdict"),
+                    "category": row.get("Category"),
+                    "reason": row.get("Reason") if isinstance(row.get("Reason"), str) else "",
+                }
+    return verdicts
+
+
+class VerdictModel:
+    """過去の Yes / No 判定で学習した TF-IDF + ロジスティック回帰"""
+
+    def __init__(self, pipeline, categories):
+        self.pipeline = pipeline
+        # Yes と判定した時のカテゴリー (過去の Yes で最も多かったもの)
+        self.categories = categories
+
+    @classmethod
+    def train(cls, past_verdicts, summaries=None, min_samples=MIN_TRAINING_SAMPLES):
+        """
+        学習用の文は今回取得した概要文 (summaries: {code: summary}) だけを使う
+        (判定に使うのも概要文なので、概要文の無い銘柄は学習から外す)。
+        scikit-learn が無い、または件数が足りない場合は None。
+        """
+        try:
+            from sklearn.feature_extraction.text import TfidfVectorizer
+            from sklearn.linear_model import LogisticRegression
+            from sklearn.pipeline import make_pipeline
+        except ImportError:
+            print("  scikit-learn が無いため、TF-IDFモデルは使わずルールだけで判定します。")
+            return None
+
+        summaries = summaries or {}
+        texts, labels, categories = [], [], {}
+        for code, past in past_verdicts.items():
+            if past["verdict"] not in ("Yes", "No"):
+                continue
+            text = summaries.get(code)
+            if not text:
+                continue
+            texts.append(text)
+            labels.append(past["verdict"])
+            if past["verdict"] == "Yes" and isinstance(past["category"], str):
+                categories[past["category"]] = categories.get(past["category"], 0) + 1
+
+        if min(labels.count("Yes"), labels.count("No")) < min_samples:
+            print(f"  学習データが足りないため、TF-IDFモデルは使いません (Yes {labels.count('Yes')} / No {labels.count('No')})")
+            return None
+
+        pipeline = make_pipeline(
+            TfidfVectorizer(ngram_range=(1, 2), min_df=2, stop_words="english", sublinear_tf=True),
+            LogisticRegression(max_iter=1000, class_weight="balanced"),
+        )
+        pipeline.fit(texts, labels)
+        print(f"  TF-IDFモデルを学習しました ({len(texts)} 件)")
+        return cls(pipeline, max(categories, key=categories.get) if categories else "N/A")
+
+    def classify(self, item):
+        """{"verdict", "category", "reason", "confidence"} を返す"""
+        probabilities = dict(zip(self.pipeline.classes_, self.pipeline.predict_proba([item.get("summary") or ""])[0]))
+        verdict = max(probabilities, key=probabilities.get)
+        return {
+            "verdict": verdict,
+            "category": self.categories if verdict == "Yes" else "N/A",
+            "reason": f"Local TF-IDF model trained on past verdicts (p={probabilities[verdict]:.2f}).",
+            "confidence": float(probabilities[verdict]),
+        }
+
+
+class PreClassifier:
+    """
+    ルール -> (あれば) TF-IDFモデルの順に判定し、確信度が閾値以上なら確定させる。
+    split(targets) で「ローカルで確定した結果」と「Geminiに送る銘柄」に分ける。
+    """
+
+    def __init__(self, model=None, rule_threshold=RULE_CONFIDENCE_THRESHOLD, model_threshold=MODEL_CONFIDENCE_THRESHOLD):
+        self.model = model
+        self.rule_threshold = rule_threshold
+        self.model_threshold = model_threshold
+
+    @classmethod
+    def from_reports(cls, targets=(), pattern=REPORT_PATTERN):
+        """過去レポートがあれば TF-IDFモデルも学習して作る"""
+        past = load_past_verdicts(pattern)
+        model = None
+        if past:
+            summaries = {item["code"]: item.get("summary") for item in targets}
+            model = VerdictModel.train(past, summaries)
+        return cls(model)
+
+    def classify(self, item):
+        """確定できれば {"verdict", "category", "reason", "confidence", "source"}、できなければ None"""
+        result = classify_by_rules(item)
+        if result["verdict"] != "Grey" and result["confidence"] >= self.rule_threshold:
+            return dict(result, source=SOURCE_RULES)
+        if self.model is not None:
+            result = self.model.classify(item)
+            if result["verdict"] in ("Yes", "No") and result["confidence"] >= self.model_threshold:
+                return dict(result, source=SOURCE_MODEL)
+        return None
+
+    def split(self, targets):
+        """戻り値: ({code: 確定した判定}, Geminiに送る item のリスト)"""
+        settled = {}
+        ambiguous = []
+        for item in targets:
+            result = self.classify(item)
+            if result is None:
+                ambiguous.append(item)
+            else:
+                settled[item["code"]] = result
+        return settled, ambiguous
@@ -0,0 +1,77 @@
+# llm_cache.py
+# Geminiの分析結果 (セグメント, IT判定) を保存する永続キャッシュ
+# キー = (モデル名, プロンプトのバージョン, 銘柄コード, 概要文) のハッシュ
+# 概要文が変わらない限り、同じ銘柄をAIに再送しない
+import os
+import json
+import time
+import hashlib
+import threading
+
+CACHE_FILE = os.getenv("LLM_CACHE_FILE", ".llm_cache.json")
+
+# False にするとキャッシュを使わず毎回AIに問い合わせる
+ENABLED = True
+
+
+def make_key(model_name, prompt_version, code, text):
+    """キャッシュキー (SHA-256) を作る"""
+    payload = json.dumps([model_name, prompt_version, code, text], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResultCache:
+    """
+    JSONファイルに保存するキャッシュ。
+    save() の時にファイルを読み直して新しい結果だけをマージするので、
+    複数のツールが同じファイルを使っても結果が消えない。
+    """
+
+    def __init__(self, path=CACHE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = self._load()
+        self._new_entries = {}
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"  ⚠️ AIキャッシュの読み込みに失敗しました (無視して続行): {e}")
+            return {}
+
+    def get(self, key):
+        """キャッシュされた結果を返す (なければ None)"""
+        if not ENABLED:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry["value"] if entry else None
+
+    def put(self, key, value):
+        if not ENABLED or value is None:
+            return
+        entry = {"value": value, "saved_at": time.time()}
+        with self._lock:
+            self._entries[key] = entry
+            self._new_entries[key] = entry
+
+    def save(self):
+        """新しく追加された結果をファイルに書き込む"""
+        with self._lock:
+            if not self._new_entries:
+                return
+            merged = self._load()
+            merged.update(self._new_entries)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(merged, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+                self._entries.update(merged)
+                self._new_entries = {}
+            except Exception as e:
+                print(f"  ⚠️ AIキャッシュの保存に失敗しました: {e}")
@@ -0,0 +1,72 @@
+# llm_dispatcher.py
+# Geminiへのバッチを複数同時に送るための仕組み
+# - モデルごとに「リクエスト数/分 (RPM)」と「トークン数/分 (TPM)」の予算を守る
+# - 応答は届いた順に返す (結果は各バッチの銘柄コードで書き戻す)
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import rate_limiter
+
+# 同時に送るバッチ数の上限
+MAX_IN_FLIGHT = 4
+
+# モデルごとの予算 (使っているプランの上限に合わせて変更する)
+MODEL_BUDGETS = {
+    "gemini-2.5-flash-lite": {"rpm": 15, "tpm": 250_000},
+    "gemini-2.5-flash": {"rpm": 10, "tpm": 250_000},
+    "gemini-2.5-pro": {"rpm": 5, "tpm": 250_000},
+}
+DEFAULT_BUDGET = {"rpm": 5, "tpm": 100_000}
+
+
+class ModelBudget:
+    """
+    1モデル分の RPM / TPM 予算 (全スレッドで共有)
+    リクエストは 60/RPM 秒に1回まで、トークンは TPM/60 ずつ補充する (最大10秒分まで貯まる)
+    """
+
+    def __init__(self, model, rpm, tpm):
+        self.model = model
+        self.rpm = rpm
+        self.tpm = tpm
+        self.requests = rate_limiter.TokenBucket(rpm / 60.0, capacity=1)
+        self.tokens = rate_limiter.TokenBucket(tpm / 60.0, capacity=tpm / 6.0)
+
+    def acquire(self, tokens):
+        """1リクエスト分と tokens 分の予算が空くまで待つ"""
+        self.requests.acquire()
+        # 1回で予算の上限を超える大きなリクエストは、上限まで貯まった時点で通す
+        self.tokens.acquire(min(float(tokens), self.tokens.capacity))
+
+
+_budgets = {}
+_budgets_lock = threading.Lock()
+
+
+def get_budget(model):
+    """モデルごとに1つの ModelBudget を返す"""
+    with _budgets_lock:
+        if model not in _budgets:
+            limits = MODEL_BUDGETS.get(model, DEFAULT_BUDGET)
+            _budgets[model] = ModelBudget(model, limits["rpm"], limits["tpm"])
+        return _budgets[model]
+
+
+def dispatch(batches, work, max_in_flight=None):
+    """
+    batches を最大 max_in_flight 個まで同時に work(batch) で処理し、
+    終わったものから (batch, 結果) を返すジェネレーター (順番は完了順)。
+    work の中で例外が起きた場合は、結果の代わりにその例外を返す。
+    """
+    batches = list(batches)
+    if not batches:
+        return
+    workers = min(max_in_flight or MAX_IN_FLIGHT, len(batches))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(work, batch): batch for batch in batches}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                result = e
+            yield futures[future], result
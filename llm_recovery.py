@@ -0,0 +1,115 @@
+# llm_recovery.py
+# Geminiのバッチ応答が壊れていた / 一部しか返ってこなかった場合の復旧処理
+# - 途中で切れたJSONからも、読める所までのエントリーを取り出す
+# - 応答に無かった銘柄だけを送り直す
+# - 失敗したバッチは半分に分けて送り直す (1件まで分けても駄目なら諦める)
+import json
+
+import rate_limiter
+
+_decoder = json.JSONDecoder()
+
+
+def _strip_code_fence(text):
+    text = str(text).strip()
+    if "```json" in text:
+        text = text.split("```json", 1)[1]
+    elif text.startswith("```"):
+        text = text.split("```", 1)[1]
+    return text.split("```", 1)[0].strip()
+
+
+def parse_json_object(text):
+    """
+    応答テキストから JSON オブジェクトを読む。
+    途中で切れている場合は、最後まで読めた "key": value の組だけを返す。
+    1件も読めなければ ValueError。
+    """
+    text = _strip_code_fence(text)
+    try:
+        result = json.loads(text)
+        if isinstance(result, dict):
+            return result
+    except json.JSONDecodeError:
+        pass
+
+    start = text.find("{")
+    if start < 0:
+        raise ValueError("応答にJSONオブジェクトがありません")
+
+    salvaged = {}
+    pos = start + 1
+    while True:
+        # 区切りの空白とカンマを飛ばす
+        while pos < len(text) and text[pos] in " \t\r\n,":
+            pos += 1
+        if pos >= len(text) or text[pos] == "}":
+            break
+        try:
+            key, pos = _decoder.raw_decode(text, pos)
+            while pos < len(text) and text[pos] in " \t\r\n":
+                pos += 1
+            if pos >= len(text) or text[pos] != ":":
+                break
+            pos += 1
+            while pos < len(text) and text[pos] in " \t\r\n":
+                pos += 1
+            value, pos = _decoder.raw_decode(text, pos)
+        except json.JSONDecodeError:
+            # ここから先は途中で切れている
+            break
+        salvaged[key] = value
+
+    if not salvaged:
+        raise ValueError("応答のJSONを読めませんでした")
+    print(f"    ⚠️ 途中で切れたJSONから {len(salvaged)} 件を取り出しました")
+    return salvaged
+
+
+def run_with_recovery(batch, request, code_of):
+    """
+    request(batch) -> {code: 結果} でバッチを送り、足りない分を復旧する。
+      - 応答に無かった銘柄だけを、もう一度まとめて送る
+      - 例外 (壊れたJSONなど) のバッチは半分に分けてそれぞれ送る
+      - 429などの制限で失敗した場合は、分けても無駄なのでそのまま諦める
+    戻り値: ({code: 結果}, 結果が得られなかった item のリスト)
+    """
+    results = {}
+    failed = []
+    pending = [list(batch)]
+
+    while pending:
+        current = pending.pop()
+        try:
+            response = request(current)
+        except Exception as e:
+            if rate_limiter.classify_error(e) == rate_limiter.THROTTLED:
+                print(f"    ⚠️ 制限のため {len(current)} 件を諦めます: {e}")
+                failed.extend(current)
+            elif len(current) == 1:
+                print(f"    ⚠️ {code_of(current[0])} の結果を取得できませんでした: {e}")
+                failed.extend(current)
+            else:
+                half = len(current) // 2
+                print(f"    ⚠️ バッチ ({len(current)} 件) が失敗したため半分に分けて送り直します: {e}")
+                pending.extend([current[half:], current[:half]])
+            continue
+
+        got = {code_of(item): response[code_of(item)] for item in current if code_of(item) in response}
+        results.update(got)
+        missing = [item for item in current if code_of(item) not in got]
+        if not missing:
+            continue
+        if not got:
+            # 1件も返ってこなかったバッチは分けて送る (1件なら諦める)
+            if len(current) == 1:
+                print(f"    ⚠️ {code_of(current[0])} が応答に含まれていませんでした")
+                failed.extend(current)
+            else:
+                half = len(current) // 2
+                pending.extend([current[half:], current[:half]])
+        else:
+            print(f"    応答に無かった {len(missing)} 件を送り直します")
+            pending.append(missing)
+
+    return results, failed
@@ -2,90 +2,96 @@
 import pandas as pd
 import datetime
 from pathlib import Path
-import sys
 import time
-from openpyxl import load_workbook
-from openpyxl.styles import Alignment, PatternFill, Font
+import argparse
 
 import yfinance_client
 import data_processor
-import stock_codes_list 
+import yahoo_cache
+import report_writer
+import run_journal
+import code_lists
 
-# --- CSVから stock_codes_list.py を生成する関数 ---
-def update_stock_codes_list_file(csv_file_path):
-    output_filename = "stock_codes_list.py"
+# --- コマンドライン引数 ---
+def parse_args():
+    parser = argparse.ArgumentParser(description="ASEAN株 財務データ取得システム")
+    parser.add_argument("csv_files", nargs="*", metavar="csv_file",
+                        help="銘柄コードのリスト (CSV / TXT / XLSX)。複数指定すると重複分は1回だけ取得し、リストごとにExcelを書く")
+    parser.add_argument("--workers", type=int, default=yfinance_client.MAX_WORKERS,
+                        help=f"並列取得のワーカー数 (デフォルト: {yfinance_client.MAX_WORKERS})")
+    parser.add_argument("--rps", type=float, default=yfinance_client.REQUESTS_PER_SECOND,
+                        help=f"Yahoo Financeへのリクエスト数/秒の上限 (デフォルト: {yfinance_client.REQUESTS_PER_SECOND})")
+    parser.add_argument("--vectorized", action="store_true",
+                        help="財務指標を全銘柄まとめて列演算で計算する")
+    parser.add_argument("--resume", action="store_true",
+                        help="前回中断した実行を再開する (取得済みの銘柄は飛ばす)")
+    parser.add_argument("--refresh", action="store_true",
+                        help="対象銘柄のキャッシュを破棄して取得し直す")
+    parser.add_argument("--incremental", action="store_true",
+                        help="決算期が変わっていない銘柄は前回の抽出結果を使い、株価・発行株数・時価総額だけを更新する")
+    parser.add_argument("--prices-only", metavar="REPORT_XLSX",
+                        help="既存レポートの株価・発行株数・時価総額だけを更新する (財務データは取り直さない)")
+    return parser.parse_args()
+
+# --- 株価だけの更新 ---
+def refresh_prices_only(report_path):
+    """既存レポートを読み込み、株価系の列だけを一括取得した quote で更新して別名保存する"""
+    print(f"=== 株価のみ更新: {report_path} ===")
     try:
-        df = pd.read_csv(csv_file_path, header=None)
-        stock_codes = df[0].astype(str).tolist()
-        print(f"\n{csv_file_path} から {len(stock_codes)} 件の銘柄コードを読み込みました。")
-        
-        with open(output_filename, 'w', encoding='utf-8') as f:
-            f.write("# stock_codes_list.py\n")
-            f.write(f"# Generated by main.py on {datetime.date.today()}\n")
-            f.write("STOCK_CODES_LIST = [\n")
-            for code in stock_codes:
-                f.write(f'    "{code.strip()}",\n')
-            f.write("]\n")
-        
-        print(f"★★★ 成功: {output_filename} を更新しました。 ★★★")
-        return True
-        
+        df = pd.read_excel(report_path)
     except FileNotFoundError:
-        print(f"エラー: CSVファイル '{csv_file_path}' が見つかりません。")
-        return False
-    except Exception as e:
-        print(f"CSV読み込みエラー: {e}")
-        return False
-
-# --- メイン処理 ---
-def main():
-    if len(sys.argv) < 2:
-        print("------------------------------------------------")
-        print("エラー: 読み込むCSVファイル名を指定してください。")
-        print("実行例: python main.py asean_list.csv")
-        print("------------------------------------------------")
+        print(f"エラー: レポート '{report_path}' が見つかりません。")
         return
-
-    csv_file_to_load = sys.argv[1]
-    
-    if not update_stock_codes_list_file(csv_file_to_load):
+    if "Code" not in df.columns:
+        print("エラー: レポートに 'Code' 列がありません。")
         return
 
+    codes = [str(c).strip() for c in df["Code"].dropna()]
+    quotes = yfinance_client.fetch_quotes(codes)
+    df = data_processor.refresh_report_prices(df, quotes)
+
+    today = datetime.date.today().strftime("%Y-%m-%d")
+    base_name = f"{Path(report_path).stem}_prices_{today}"
+    filename = f"{base_name}.xlsx"
+    counter = 1
+    while Path(filename).exists():
+        filename = f"{base_name}_{counter}.xlsx"
+        counter += 1
+
     try:
-        import stock_codes_list
-        import yfinance_client
-        import data_processor
-    except ImportError as e:
-        print(f"モジュールインポートエラー: {e}")
-        return
+        report_writer.write_report(df, filename)
+        print(f"★★★ 成功: {filename} に保存しました ★★★")
+    except Exception as e:
+        print(f"エラー: Excel保存に失敗しました ({e})")
 
-    print("=== ASEAN株 財務データ取得システム (Yahoo Finance版) ===")
-    
-    codes = stock_codes_list.STOCK_CODES_LIST
-    print(f"取得対象: {len(codes)} 銘柄")
-    
-    all_results = []
+# --- 差分更新 ---
+# 銘柄ごとの最新の抽出結果と、その時の決算期 (実行をまたいで保存する)
+LATEST_RECORDS_NAME = "latest_records"
 
-    for code in codes:
-        print(f"\n--- {code} の処理中 ---")
-        
-        raw_data = yfinance_client.get_stock_data(code)
-        
-        if raw_data:
-            processed_data = data_processor.extract_data(code, raw_data)
-            all_results.append(processed_data)
-            
-            print(f"  会社名: {processed_data.get('Name of Company')}")
-            print(f"  売上高: {processed_data.get('REVENUE')}")
-        else:
-            print("  データの取得に失敗しました。")
+def reuse_unchanged_records(codes, store, quotes):
+    """
+    前回の抽出結果があり、決算期 (lastFiscalYearEnd / mostRecentQuarter) が変わっていない銘柄は
+    財務諸表を取り直さず、株価・発行株数・時価総額だけを更新したレコードを使う。
+    戻り値: ({code: (レコード, 決算期)}, 取得し直す銘柄のリスト)
+    """
+    known = [code for code in codes if store.has(code)]
+    current = yfinance_client.fetch_fiscal_periods(known)
 
-    # --- バッチ処理でAI分析 (セグメント抽出) ---
-    if all_results:
-        print("\n--- 全データ取得完了。AIによるセグメント分析を開始します ---")
-        all_results = data_processor.batch_analyze_segments(all_results)
+    reused = {}
+    for code in known:
+        saved = store.get(code)
+        periods = current.get(code)
+        if periods and any(periods.values()) and periods == saved.get("periods"):
+            record = data_processor.refresh_volatile_fields(saved["record"], quotes.get(code))
+            reused[code] = (record, periods)
 
-    # --- Excel保存処理 ---
+    refetch = [code for code in codes if code not in reused]
+    print(f"差分更新: 前回の結果を使う {len(reused)} 銘柄 / 取得し直す {len(refetch)} 銘柄")
+    return reused, refetch
+
+# --- Excel保存処理 ---
+def save_report(all_results, prefix="asean_financial_data"):
+    """1つのリスト分のレコードを書式付きExcelに保存する (ファイル名: <prefix>_<日付>.xlsx)"""
     if all_results:
         print("\nExcelファイルを作成しています...")
         df = pd.DataFrame(all_results)
@@ -179,7 +185,7 @@ def main():
 
         # ファイル名生成
         today = datetime.date.today().strftime("%Y-%m-%d")
-        base_name = f"asean_financial_data_{today}"
+        base_name = f"{prefix}_{today}"
         filename = f"{base_name}.xlsx"
         
         counter = 1
@@ -188,51 +194,8 @@ def main():
             counter += 1
             
         try:
-            # 1. 保存
-            df.to_excel(filename, index=False)
-            
-            # 2. 書式設定
-            wb = load_workbook(filename)
-            ws = wb.active
-            right_align = Alignment(horizontal='right')
-            
-            # デザイン設定
-            header_fill = PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")
-            header_font = Font(bold=True)
-
-            for cell in ws[1]:
-                col_name = str(cell.value)
-                col_idx = cell.column
-                
-                cell.fill = header_fill
-                cell.font = header_font
-                
-                number_format = None
-                apply_alignment = False
-                
-                # 書式判定
-                if "('000)" in col_name:
-                    number_format = '#,##0;(#,##0)'
-                    apply_alignment = True
-                elif "(%)" in col_name or "%" in col_name:
-                    number_format = '0.00%'
-                    apply_alignment = True
-                elif col_name == "FY":
-                    apply_alignment = True
-                # ★追加: 株価は小数点表示
-                elif "Stock Price" in col_name:
-                    number_format = '#,##0.000'
-                    apply_alignment = True
-                
-                if number_format or apply_alignment:
-                    for row in ws.iter_rows(min_row=2, min_col=col_idx, max_col=col_idx):
-                        for cell_data in row:
-                            if apply_alignment:
-                                cell_data.alignment = right_align
-                            if number_format:
-                                cell_data.number_format = number_format
-            
-            wb.save(filename)
+            # 書式付きで1回だけ書き込む
+            report_writer.write_report(df, filename)
             print(f"★★★ 成功: {filename} に保存しました ★★★")
             
         except Exception as e:
@@ -241,5 +204,133 @@ def main():
     else:
         print("保存するデータがありませんでした。")
 
+# --- メイン処理 ---
+def main():
+    args = parse_args()
+    if args.prices_only:
+        refresh_prices_only(args.prices_only)
+        return
+
+    if not args.csv_files:
+        print("------------------------------------------------")
+        print("エラー: 読み込むCSVファイル名を指定してください。")
+        print("実行例: python main.py asean_list.csv")
+        print("       python main.py asean_list.csv IT_Targets_SG.csv Malaysia/malaysia_list.csv")
+        print("------------------------------------------------")
+        return
+
+    # リストは直接メモリに読み込む (表記をそろえ、重複は除く)
+    # 複数リストの場合は和集合を1回だけ取得・分析し、Excelはリストごとに書く
+    try:
+        lists = {path: code_lists.load_codes(path) for path in dict.fromkeys(args.csv_files)}
+        codes = list(dict.fromkeys(code for list_codes in lists.values() for code in list_codes))
+    except FileNotFoundError as e:
+        print(f"エラー: {e}")
+        return
+    except Exception as e:
+        print(f"リスト読み込みエラー: {e}")
+        return
+
+    print("=== ASEAN株 財務データ取得システム (Yahoo Finance版) ===")
+    
+    if len(lists) > 1:
+        print(f"取得対象: {len(codes)} 銘柄 ({len(lists)} リスト, 合計 {sum(map(len, lists.values()))} 行)")
+    else:
+        print(f"取得対象: {len(codes)} 銘柄")
+    
+    if args.refresh:
+        print("キャッシュを破棄して取得し直します...")
+        for code in codes:
+            yahoo_cache.invalidate(code)
+
+    # 途中経過のジャーナル (--resume の場合は取得済みの銘柄を飛ばす)
+    journal = run_journal.RunJournal(
+        run_journal.journal_path("main_" + "_".join(Path(p).stem for p in lists)), resume=args.resume
+    )
+    pending = [code for code in codes if not journal.has(code)]
+    if args.resume:
+        print(f"未取得: {len(pending)} 銘柄")
+
+    # セグメント分析は取得と並行してバックグラウンドで進める
+    analyzer = data_processor.SegmentStreamAnalyzer()
+    for code in codes:
+        if journal.has(code):
+            analyzer.submit(journal.get(code))
+
+    # 株価・発行株数・時価総額は quote API でまとめて取得する
+    quotes = yfinance_client.fetch_quotes(pending)
+    # 為替レートも取得ループの前にまとめて取得する
+    data_processor.prefetch_run_exchange_rates(quotes)
+
+    # 取得した銘柄の決算期 (差分更新の保存用)
+    periods_by_code = {}
+    store = None
+    if args.incremental:
+        store = run_journal.RunJournal(run_journal.journal_path(LATEST_RECORDS_NAME), resume=True)
+        # --refresh の場合は前回の結果を使わず全て取り直す (保存はする)
+        reused = {}
+        if not args.refresh:
+            reused, pending = reuse_unchanged_records(pending, store, quotes)
+        for code, (record, periods) in reused.items():
+            journal.append(code, record)
+            analyzer.submit(record)
+            periods_by_code[code] = periods
+
+    if args.vectorized:
+        # 全銘柄の取得後にまとめて計算してからジャーナルに書く
+        fetched = yfinance_client.fetch_all_stock_data(
+            pending, max_workers=args.workers, requests_per_second=args.rps
+        )
+
+        # 全銘柄の通貨をまとめて、為替レートを一括取得
+        data_processor.prefetch_exchange_rates([raw for _, raw in fetched])
+
+        processed_list = data_processor.extract_data_bulk(fetched, quotes)
+        for (code, raw_data), processed_data in zip(fetched, processed_list):
+            if processed_data:
+                periods_by_code[code] = yfinance_client.fiscal_periods_from_info(raw_data.get("info"))
+                journal.append(code, processed_data)
+                analyzer.submit(processed_data)
+            else:
+                print(f"  {code}: データの取得に失敗しました。")
+    else:
+        # 取得が終わった銘柄から順に抽出し、すぐにジャーナルへ追記する
+        for code, raw_data in yfinance_client.iter_stock_data(
+            pending, max_workers=args.workers, requests_per_second=args.rps
+        ):
+            print(f"\n--- {code} の処理中 ---")
+            
+            if raw_data:
+                processed_data = data_processor.extract_data(code, raw_data, quote=quotes.get(code))
+                periods_by_code[code] = yfinance_client.fiscal_periods_from_info(raw_data.get("info"))
+                journal.append(code, processed_data)
+                analyzer.submit(processed_data)
+                
+                print(f"  会社名: {processed_data.get('Name of Company')}")
+                print(f"  売上高: {processed_data.get('REVENUE')}")
+            else:
+                print("  データの取得に失敗しました。")
+
+    # 残りのセグメント分析が終わるのを待つ
+    print("\n--- 全データ取得完了。残りのセグメント分析を待っています ---")
+    analyzer.close()
+
+    # 次回の差分更新のために、今回の結果 (セグメント分析済み) と決算期を保存する
+    if store is not None:
+        for code, periods in periods_by_code.items():
+            if journal.has(code):
+                store.append(code, {"record": journal.get(code), "periods": periods})
+        store.compact()
+
+    # 全リスト共通の株価列名にそろえてから、リストごとに入力順で並べ直す (Excelの Ref 番号を安定させる)
+    data_processor.unify_stock_price_column([journal.get(code) for code in codes if journal.has(code)])
+    for list_file, list_codes in lists.items():
+        all_results = [journal.get(code) for code in list_codes if journal.has(code)]
+        if len(lists) > 1:
+            print(f"\n=== {list_file}: {len(all_results)} / {len(list_codes)} 銘柄 ===")
+            save_report(all_results, f"{Path(list_file).stem}_financial_data")
+        else:
+            save_report(all_results)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -3,15 +3,99 @@ import pandas as pd
 import datetime
 from pathlib import Path
 import sys
-import time
-from openpyxl import load_workbook
-from openpyxl.styles import Alignment, PatternFill, Font
+import argparse
 
 import yfinance_client
 import data_processor
-import asean_stock_codes 
+import report_writer
+import run_journal
+import sector_index
+import universe
+
+def screen_codes(target_suffixes, target_sectors):
+    """国フィルターとセクター検索で対象銘柄を絞り込む"""
+    # ---------------------------------------------------------
+    # 3. リストからのフィルタリング
+    # ---------------------------------------------------------
+    print("登録簿から対象国の銘柄を抽出しています...")
+    
+    # 登録簿はサフィックスごとの索引を持っているので、全件を走査しない
+    registry = universe.get_universe()
+    country_filtered_codes = [code for suffix in target_suffixes for code in registry.by_suffix(suffix)]
+            
+    print(f"国フィルター適用後: {len(country_filtered_codes)} 件の銘柄が対象です。")
+    
+    if not country_filtered_codes:
+        print("対象となる銘柄が見つかりませんでした。")
+        return []
+
+    # ---------------------------------------------------------
+    # 4. セクターによるスクリーニング
+    # ---------------------------------------------------------
+    # 索引にない / 古い銘柄だけYahooから取得し、検索はローカルで行う
+    index = sector_index.SectorIndex()
+    index.refresh(country_filtered_codes)
+
+    print("セクター検索を開始します (ローカル索引)...")
+    target_codes = index.screen(country_filtered_codes, target_sectors)
+    for code in target_codes:
+        entry = index.lookup(code)
+        print(f"  -> Hit! {code}: {entry.get('longName')} ({entry.get('sector')})")
+
+    print(f"\n検索終了。該当銘柄数: {len(target_codes)} 件")
+    return target_codes
+
+def discover_codes(target_countries, target_suffixes, target_sectors, resume=False):
+    """
+    国とセクターの条件をスクリーナーに送り、該当する銘柄だけを受け取る。
+    スクリーナーはセクター名の完全一致 (大文字小文字は区別しない) でしか絞り込めず、
+    対象も登録簿ではなくその地域の全銘柄になる。
+    スクリーナーに無いセクター名・取得失敗・該当0件の場合は None を返す (ローカル索引での検索に切り替える)
+    """
+    regions = [c.lower() for c in target_countries]
+    try:
+        valid = {name.lower(): name for name in yfinance_client.screener_sectors()}
+    except Exception as e:
+        print(f"スクリーナーのセクター一覧を取得できませんでした: {e}")
+        return None
+    unknown = [s for s in target_sectors if s.lower() not in valid]
+    if unknown:
+        print(f"スクリーナーに無いセクター名です: {', '.join(unknown)} (ローカル索引で部分一致検索します)")
+        return None
+    sectors = [valid[s.lower()] for s in target_sectors]
+
+    try:
+        quotes = list(yfinance_client.screen_equities(regions, sectors, resume=resume))
+    except Exception as e:
+        print(f"スクリーナーでの検索に失敗しました: {e}")
+        return None
+
+    target_codes = []
+    for quote in quotes:
+        code = quote["symbol"]
+        # 他国市場の重複上場などは除き、選んだ取引所の銘柄だけにする
+        if any(code.endswith(suffix) for suffix in target_suffixes) and code not in target_codes:
+            target_codes.append(code)
+            print(f"  -> Hit! {code}: {quote.get('longName') or quote.get('shortName')}")
+
+    if not target_codes:
+        print("スクリーナーで該当する銘柄がありませんでした (ローカル索引で検索します)")
+        return None
+    print(f"\n検索終了。該当銘柄数: {len(target_codes)} 件")
+    return target_codes
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="国・セクター別 ASEAN株 財務データ取得システム")
+    parser.add_argument("--resume", action="store_true",
+                        help="前回中断した実行を再開する (取得済みの銘柄は飛ばす)")
+    parser.add_argument("--discovery", choices=["screener", "index"], default="index",
+                        help="銘柄の探し方: index=登録簿の銘柄をローカル索引でセクター名の部分一致で絞り込む (デフォルト), "
+                             "screener=スクリーナーに条件を送る (セクター名は完全一致, 登録簿外の銘柄も含む。"
+                             "該当0件や未知のセクター名の場合は index に切り替える)")
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
     print("=== 国・セクター別 ASEAN株 財務データ取得システム (AIセグメント分析対応版) ===")
     
     # ---------------------------------------------------------
@@ -64,55 +148,29 @@ def main():
     target_sectors = [s.strip() for s in sector_input.split(',') if s.strip()]
     print(f"\nターゲットセクター: {target_sectors}")
 
-    # ---------------------------------------------------------
-    # 3. リストからのフィルタリング
-    # ---------------------------------------------------------
-    print("内蔵リストから対象国の銘柄を抽出しています...")
-    
-    all_codes = asean_stock_codes.ALL_ASEAN_CODES
-    country_filtered_codes = []
-    
-    for code in all_codes:
-        if any(code.endswith(suffix) for suffix in target_suffixes):
-            country_filtered_codes.append(code)
-            
-    print(f"国フィルター適用後: {len(country_filtered_codes)} 件の銘柄が対象です。")
-    
-    if not country_filtered_codes:
-        print("対象となる銘柄が見つかりませんでした。")
-        return
-
-    # ---------------------------------------------------------
-    # 4. セクターによるスクリーニング
-    # ---------------------------------------------------------
-    target_codes = []
-    import yfinance as yf
+    countries_str = "_".join(target_countries)
+    if len(target_sectors) == 1:
+        sector_name_for_file = target_sectors[0].replace(" ", "_").replace("/", "-")
+    else:
+        sector_name_for_file = "Multi_Sectors"
 
-    print("セクター検索を開始します (yfinance)...")
-    for i, code in enumerate(country_filtered_codes):
-        print(f"\rスクリーニング中: {i+1}/{len(country_filtered_codes)} ({code})", end="")
-        
-        try:
-            ticker = yf.Ticker(code)
-            info = ticker.info
-            company_sector = info.get('sector', 'Unknown')
-            
-            is_match = False
-            for target in target_sectors:
-                if target.lower() in str(company_sector).lower():
-                    is_match = True
-                    break
-            
-            if is_match:
-                target_codes.append(code)
-                print(f"\n  -> Hit! {code}: {info.get('longName')} ({company_sector})")
-                
-        except Exception:
-            pass 
-            
-        time.sleep(0.1)
+    # 途中経過のジャーナル (--resume の場合は前回の対象リストと取得済みの銘柄を再利用)
+    journal = run_journal.RunJournal(
+        run_journal.journal_path(f"sector_{countries_str}_{sector_name_for_file}"), resume=args.resume
+    )
 
-    print(f"\n\n検索終了。該当銘柄数: {len(target_codes)} 件")
+    target_codes = journal.get_meta("target_codes")
+    if target_codes is None:
+        if args.discovery == "screener":
+            target_codes = discover_codes(
+                [c for c in target_countries if c in suffix_map], target_suffixes, target_sectors,
+                resume=args.resume,
+            )
+        if target_codes is None:
+            target_codes = screen_codes(target_suffixes, target_sectors)
+        journal.set_meta("target_codes", target_codes)
+    else:
+        print(f"前回のスクリーニング結果を使います: {len(target_codes)} 件")
     
     if len(target_codes) == 0:
         print("該当する銘柄が見つかりませんでした。")
@@ -123,29 +181,41 @@ def main():
     # ---------------------------------------------------------
     print("\n詳細データの取得を開始します...")
     
-    all_results = []
-    
+    pending = [code for code in target_codes if not journal.has(code)]
+
+    # セグメント分析は取得と並行してバックグラウンドで進める
+    analyzer = data_processor.SegmentStreamAnalyzer()
     for code in target_codes:
+        if journal.has(code):
+            analyzer.submit(journal.get(code))
+
+    # 株価・発行株数・時価総額は quote API でまとめて取得する
+    quotes = yfinance_client.fetch_quotes(pending)
+    # 為替レートも取得ループの前にまとめて取得する
+    data_processor.prefetch_run_exchange_rates(quotes)
+
+    # 取得が終わった銘柄から順に抽出し、すぐにジャーナルへ追記する
+    for code, raw_data in yfinance_client.iter_stock_data(pending):
         print(f"\n--- {code} の処理中 ---")
         
-        raw_data = yfinance_client.get_stock_data(code)
-        
         if raw_data:
-            processed_data = data_processor.extract_data(code, raw_data)
-            all_results.append(processed_data)
+            processed_data = data_processor.extract_data(code, raw_data, quote=quotes.get(code))
+            journal.append(code, processed_data)
+            analyzer.submit(processed_data)
             print(f"  会社名: {processed_data.get('Name of Company')}")
             print(f"  売上高: {processed_data.get('REVENUE')}")
         else:
             print("  データの取得に失敗しました。")
-            
-        time.sleep(0.5)
 
     # ---------------------------------------------------------
-    # 6. AIによるセグメント分析
+    # 6. AIによるセグメント分析 (取得と並行して実行中。残りを待つ)
     # ---------------------------------------------------------
-    if all_results:
-        print("\n--- 全データ取得完了。AIによるセグメント分析を開始します ---")
-        all_results = data_processor.batch_analyze_segments(all_results)
+    print("\n--- 全データ取得完了。残りのセグメント分析を待っています ---")
+    analyzer.close()
+
+    # 入力順に並べ直す (Excelの Ref 番号を安定させる)
+    all_results = [journal.get(code) for code in target_codes if journal.has(code)]
+    data_processor.unify_stock_price_column(all_results)
 
     # ---------------------------------------------------------
     # 7. Excel生成
@@ -236,12 +306,6 @@ def main():
         df = df.rename(columns={"Number of Employee": "Number of Employee Current"})
 
         # ファイル名生成
-        countries_str = "_".join(target_countries)
-        if len(target_sectors) == 1:
-            sector_name_for_file = target_sectors[0].replace(" ", "_").replace("/", "-")
-        else:
-            sector_name_for_file = "Multi_Sectors"
-
         today = datetime.date.today().strftime("%Y-%m-%d")
         base_name = f"asean_data_{countries_str}_{sector_name_for_file}_{today}"
         filename = f"{base_name}.xlsx"
@@ -252,49 +316,8 @@ def main():
             counter += 1
             
         try:
-            # 1. 保存
-            df.to_excel(filename, index=False)
-            
-            # 2. 書式設定
-            wb = load_workbook(filename)
-            ws = wb.active
-            right_align = Alignment(horizontal='right')
-            
-            header_fill = PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")
-            header_font = Font(bold=True)
-
-            for cell in ws[1]:
-                col_name = str(cell.value)
-                col_idx = cell.column
-                
-                cell.fill = header_fill
-                cell.font = header_font
-                
-                number_format = None
-                apply_alignment = False
-                
-                if "('000)" in col_name:
-                    number_format = '#,##0;(#,##0)'
-                    apply_alignment = True
-                elif "(%)" in col_name or "%" in col_name:
-                    number_format = '0.00%'
-                    apply_alignment = True
-                elif col_name == "FY":
-                    apply_alignment = True
-                # ★追加: Stock Priceも数値フォーマット
-                elif "Stock Price" in col_name:
-                    number_format = '#,##0.000' # 小数点3桁まで表示
-                    apply_alignment = True
-                
-                if number_format or apply_alignment:
-                    for row in ws.iter_rows(min_row=2, min_col=col_idx, max_col=col_idx):
-                        for cell_data in row:
-                            if apply_alignment:
-                                cell_data.alignment = right_align
-                            if number_format:
-                                cell_data.number_format = number_format
-            
-            wb.save(filename)
+            # 書式付きで1回だけ書き込む
+            report_writer.write_report(df, filename)
             print(f"★★★ 成功: {filename} に保存しました ★★★")
             
         except Exception as e:
@@ -0,0 +1,215 @@
+# rate_limiter.py
+import random
+import re
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    複数スレッドで共有するトークンバケット方式のレートリミッター
+    rate: 1秒あたりに補充されるトークン数 (= 許可するリクエスト数/秒)
+    capacity: 一度に使えるトークンの上限 (バースト幅)
+    """
+
+    def __init__(self, rate, capacity=None):
+        self._lock = threading.Lock()
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity else max(1.0, self.rate)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+
+    def set_rate(self, rate, capacity=None):
+        """実行中にレートを変更する"""
+        with self._lock:
+            self._refill()
+            self.rate = float(rate)
+            self.capacity = float(capacity) if capacity else max(1.0, self.rate)
+            self._tokens = min(self._tokens, self.capacity)
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self, tokens=1):
+        """トークンが貯まるまで待ってから消費する"""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait_time = (tokens - self._tokens) / self.rate
+            time.sleep(wait_time)
+
+
+# --- 429を見ながら同時実行数を自動調整するリミッター (AIMD) ---
+
+# 呼び出し結果の分類
+OK = "ok"
+THROTTLED = "throttled"   # 429 / quota / timeout -> 同時実行数を半分にする
+TRANSIENT = "transient"   # 一時的な通信エラー -> 同時実行数はそのまま、再試行する
+FAILED = "failed"         # 再試行しても無駄なエラー
+
+# HTTP ステータスでの分類
+_THROTTLE_STATUSES = (429,)
+_TRANSIENT_STATUSES = (500, 502, 503, 504)
+
+# 例外の型名での分類 (requests / curl_cffi / yfinance / Google API の例外をまとめて扱うため型名で見る)
+_THROTTLE_TYPES = ("YFRateLimitError", "TooManyRequests", "ResourceExhausted")
+_TIMEOUT_TYPES = ("TimeoutError", "Timeout", "ReadTimeout", "ConnectTimeout", "DeadlineExceeded")
+_TRANSIENT_TYPES = ("ConnectionError", "ServiceUnavailable", "InternalServerError", "BadGateway", "GatewayTimeout")
+
+# メッセージでの分類は単語単位の言葉だけにする
+# (メッセージには銘柄コードやURLが入るので、"429" や "503" のような数字では判定しない)
+_THROTTLE_PATTERN = re.compile(r"\b(too many requests|rate ?limit(ed)?|quota|resource[_ ]exhausted)\b")
+_TIMEOUT_PATTERN = re.compile(r"\b(timed out|timeout)\b")
+_TRANSIENT_PATTERN = re.compile(
+    r"\b(service unavailable|temporarily unavailable|bad gateway|internal server error"
+    r"|connection (reset|aborted|refused|error)|remote end closed)\b"
+)
+
+
+def _status_of(error):
+    """例外に付いている HTTP ステータス (無ければ None)"""
+    response = getattr(error, "response", None)
+    for value in (getattr(response, "status_code", None), getattr(error, "status_code", None), getattr(error, "code", None)):
+        if isinstance(value, int):
+            return int(value)
+    return None
+
+
+def classify_error(error):
+    """例外を THROTTLED / TRANSIENT / FAILED に分類する (ステータス -> 型 -> メッセージの順)"""
+    status = _status_of(error)
+    if status in _THROTTLE_STATUSES:
+        return THROTTLED
+    if status in _TRANSIENT_STATUSES:
+        return TRANSIENT
+
+    type_names = {cls.__name__ for cls in type(error).__mro__}
+    if type_names.intersection(_THROTTLE_TYPES) or type_names.intersection(_TIMEOUT_TYPES):
+        return THROTTLED
+    if type_names.intersection(_TRANSIENT_TYPES):
+        return TRANSIENT
+
+    text = str(error).lower()
+    if _THROTTLE_PATTERN.search(text) or _TIMEOUT_PATTERN.search(text):
+        return THROTTLED
+    if _TRANSIENT_PATTERN.search(text):
+        return TRANSIENT
+    return FAILED
+
+
+def backoff_delay(attempt, base_delay=1.0, max_delay=60.0):
+    """ジッター付き指数バックオフ (待ち時間の半分は固定, 残り半分をランダム)"""
+    delay = min(max_delay, base_delay * (2 ** attempt))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class AdaptiveLimiter:
+    """
+    接続先ごとの予算を持つ AIMD 方式のリミッター
+    - 成功が続くと同時実行数を少しずつ増やす (1周 = limit 回の成功で +1)
+    - 429 やタイムアウトで同時実行数を半分にする
+    - リクエスト数/秒の上限は 同時実行数 / 最大同時実行数 に比例させる
+    - 失敗した呼び出しはジッター付き指数バックオフで再試行する
+    """
+
+    def __init__(self, name, max_concurrency=8, max_rate=None, initial_concurrency=None,
+                 min_concurrency=1, decrease_factor=0.5, max_retries=5,
+                 base_delay=1.0, max_delay=60.0):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.decrease_factor = decrease_factor
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.limit = float(initial_concurrency or max(min_concurrency, max_concurrency / 2))
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        self.max_rate = max_rate
+        self.bucket = TokenBucket(self._current_rate()) if max_rate else None
+
+    def _current_rate(self):
+        return max(0.1, self.max_rate * self.limit / self.max_concurrency)
+
+    @property
+    def rate(self):
+        return self.bucket.rate if self.bucket else None
+
+    def configure(self, max_concurrency=None, max_rate=None):
+        """最大同時実行数 / 最大リクエスト数/秒 を変更する"""
+        with self._cond:
+            if max_concurrency:
+                self.max_concurrency = max_concurrency
+                self.limit = min(self.limit, float(max_concurrency))
+            if max_rate:
+                self.max_rate = max_rate
+                if self.bucket is None:
+                    self.bucket = TokenBucket(self._current_rate())
+            self._apply_rate()
+            self._cond.notify_all()
+
+    def _apply_rate(self):
+        if self.bucket:
+            self.bucket.set_rate(self._current_rate())
+
+    def acquire(self):
+        with self._cond:
+            while self._in_flight >= int(self.limit):
+                self._cond.wait()
+            self._in_flight += 1
+        if self.bucket:
+            self.bucket.acquire()
+
+    def release(self, outcome=OK):
+        with self._cond:
+            self._in_flight -= 1
+            if outcome == OK:
+                # 加算的に増やす
+                self.limit = min(float(self.max_concurrency), self.limit + 1.0 / self.limit)
+                self._apply_rate()
+            elif outcome == THROTTLED:
+                # 乗算的に減らす
+                old_limit = int(self.limit)
+                self.limit = max(float(self.min_concurrency), self.limit * self.decrease_factor)
+                self._apply_rate()
+                if int(self.limit) < old_limit:
+                    print(f"  ⚠️ [{self.name}] 制限を検知: 同時実行数 {old_limit} -> {int(self.limit)}")
+            self._cond.notify_all()
+
+    def call(self, func, *args, **kwargs):
+        """
+        func を予算内で実行する。429・タイムアウト・一時的なエラーは
+        バックオフして再試行し、それ以外のエラーはそのまま投げる。
+        """
+        for attempt in range(self.max_retries + 1):
+            self.acquire()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                outcome = classify_error(e)
+                self.release(outcome)
+                if outcome == FAILED or attempt >= self.max_retries:
+                    raise
+                wait_time = backoff_delay(attempt, self.base_delay, self.max_delay)
+                print(f"  ⚠️ [{self.name}] {outcome}: {e} -> {wait_time:.1f}秒後に再試行 ({attempt + 1}/{self.max_retries})")
+                time.sleep(wait_time)
+            else:
+                self.release(OK)
+                return result
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(name, **kwargs):
+    """接続先ごとに1つの AdaptiveLimiter を返す (初回の引数で作成)"""
+    with _limiters_lock:
+        if name not in _limiters:
+            _limiters[name] = AdaptiveLimiter(name, **kwargs)
+        return _limiters[name]
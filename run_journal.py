@@ -0,0 +1,122 @@
+# run_journal.py
+# 実行途中の結果を1件ずつ追記するジャーナル (JSONL)
+# 途中で止まっても、--resume で取得済みの銘柄を飛ばして再開できる
+import os
+import json
+import datetime
+import threading
+import numpy as np
+
+JOURNAL_DIR = ".runs"
+
+
+def journal_path(name):
+    """ジャーナルファイルのパス (.runs/<name>.jsonl)"""
+    safe_name = "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
+    return os.path.join(JOURNAL_DIR, f"{safe_name}.jsonl")
+
+
+def _encode(obj):
+    """json で書けない値の変換 (日付は復元できるように印を付ける)"""
+    if isinstance(obj, (datetime.datetime, datetime.date)):
+        return {"__datetime__": obj.isoformat()}
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return str(obj)
+
+
+def _decode(obj):
+    if "__datetime__" in obj and len(obj) == 1:
+        return datetime.datetime.fromisoformat(obj["__datetime__"])
+    return obj
+
+
+class RunJournal:
+    """
+    1行1件の追記専用ジャーナル
+      {"type": "record", "code": ..., "record": {...}}  抽出済みの1銘柄
+      {"type": "meta", "key": ..., "value": ...}        対象リストなどの付帯情報
+    resume=False の場合は既存のジャーナルを消して新しく始める。
+    """
+
+    def __init__(self, path, resume=False):
+        self.path = path
+        self._lock = threading.Lock()
+        self._records = {}
+        self._meta = {}
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if resume:
+            self._load()
+        elif os.path.exists(path):
+            os.remove(path)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line, object_hook=_decode)
+                except json.JSONDecodeError:
+                    # 書き込み途中で止まった最終行などは無視
+                    continue
+                if entry.get("type") == "record":
+                    self._records[entry["code"]] = entry["record"]
+                elif entry.get("type") == "meta":
+                    self._meta[entry["key"]] = entry["value"]
+        print(f"ジャーナルから再開します: {len(self._records)} 件取得済み ({self.path})")
+
+    def _write(self, entry):
+        line = json.dumps(entry, ensure_ascii=False, default=_encode)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def append(self, code, record):
+        """抽出済みの1銘柄をすぐにファイルへ追記する"""
+        self._write({"type": "record", "code": code, "record": record})
+        with self._lock:
+            self._records[code] = record
+
+    def set_meta(self, key, value):
+        self._write({"type": "meta", "key": key, "value": value})
+        with self._lock:
+            self._meta[key] = value
+
+    def get_meta(self, key, default=None):
+        return self._meta.get(key, default)
+
+    def compact(self):
+        """各キーの最新の値だけを残してファイルを書き直す (追記で大きくなったジャーナル用)"""
+        with self._lock:
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for key, value in self._meta.items():
+                    entry = {"type": "meta", "key": key, "value": value}
+                    f.write(json.dumps(entry, ensure_ascii=False, default=_encode) + "\n")
+                for code, record in self._records.items():
+                    entry = {"type": "record", "code": code, "record": record}
+                    f.write(json.dumps(entry, ensure_ascii=False, default=_encode) + "\n")
+            os.replace(tmp_path, self.path)
+
+    def clear(self):
+        """ジャーナルを消す (最後まで終わって、再開に使う必要がなくなった時)"""
+        with self._lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self._records = {}
+            self._meta = {}
+
+    def items(self):
+        """記録済みの (code, record) を追記順に返す"""
+        with self._lock:
+            return list(self._records.items())
+
+    def has(self, code):
+        return code in self._records
+
+    def get(self, code):
+        return self._records.get(code)
@@ -1,5 +1,8 @@
-import yfinance as yf
 import pandas as pd
+import yfinance_client
+
+# 必要な項目は info だけで取れる (財務諸表などは取得しない)
+INFO_FIELDS = ("Name of Company", "Sector", "Industry")
 
 def check_sectors(tickers):
     """
@@ -13,8 +16,10 @@ def check_sectors(tickers):
     for ticker_symbol in tickers:
         print(f"Checking: {ticker_symbol} ...")
         try:
-            ticker = yf.Ticker(ticker_symbol)
-            info = ticker.info
+            raw_data = yfinance_client.get_stock_data(ticker_symbol, fields=INFO_FIELDS)
+            if raw_data is None:
+                raise ValueError("データを取得できませんでした")
+            info = raw_data.get("info", {})
             
             # 取得したい情報
             name = info.get('longName', 'N/A')
@@ -0,0 +1,113 @@
+# sector_index.py
+# 銘柄コード -> セクター / 業種 / 会社名 のローカル索引
+# スクリーニングはこの索引を引くだけにして、古くなった銘柄だけをYahooから取り直す
+import os
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import yfinance_client
+
+INDEX_FILE = os.getenv("SECTOR_INDEX_FILE", ".sector_index.json")
+
+# セクターはめったに変わらないので、30日経ったら取り直す
+STALE_AFTER = 30 * 24 * 60 * 60
+
+# 索引に入れる項目 (info だけを取得する)
+INFO_FIELDS = ("Name of Company", "Sector", "Industry")
+
+
+class SectorIndex:
+    """
+    {code: {"sector", "industry", "longName", "refreshed_at"}} をJSONで保存する索引
+    """
+
+    def __init__(self, path=INDEX_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"  ⚠️ セクター索引の読み込みに失敗しました (作り直します): {e}")
+            return {}
+
+    def save(self):
+        with self._lock:
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.path)
+
+    def lookup(self, code):
+        return self._entries.get(code)
+
+    def is_stale(self, code, max_age=STALE_AFTER):
+        entry = self._entries.get(code)
+        if not entry:
+            return True
+        return time.time() - entry.get("refreshed_at", 0) > max_age
+
+    def update_from_info(self, code, info):
+        """ticker.info から索引を更新する (他の処理で info を取得した時にも使える)"""
+        with self._lock:
+            self._entries[code] = {
+                "sector": info.get("sector"),
+                "industry": info.get("industry"),
+                "longName": info.get("longName"),
+                "refreshed_at": time.time(),
+            }
+
+    def refresh(self, codes, max_workers=None, max_age=STALE_AFTER):
+        """
+        索引にない / 古くなった銘柄だけをYahooから取り直して保存する。
+        取得に失敗した銘柄は索引に入れず、次回また取り直す。
+        """
+        stale_codes = [code for code in dict.fromkeys(codes) if self.is_stale(code, max_age)]
+        if not stale_codes:
+            print(f"セクター索引は最新です ({len(codes)} 銘柄)")
+            return 0
+
+        print(f"セクター索引を更新中: {len(stale_codes)} / {len(codes)} 銘柄...")
+
+        def fetch(code):
+            try:
+                # セクター検索に必要なのは info だけ
+                raw_data = yfinance_client.get_stock_data(code, fields=INFO_FIELDS)
+                return code, raw_data.get("info") if raw_data else None
+            except Exception as e:
+                print(f"  取得エラー ({code}): {e}")
+                return code, None
+
+        refreshed = 0
+        workers = max_workers or yfinance_client.MAX_WORKERS
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for code, info in executor.map(fetch, stale_codes):
+                if info:
+                    self.update_from_info(code, info)
+                    refreshed += 1
+
+        self.save()
+        print(f"セクター索引を更新しました: {refreshed} 件")
+        return refreshed
+
+    def screen(self, codes, target_sectors):
+        """
+        索引だけを使ってセクターが一致する銘柄を返す (部分一致, 大文字小文字を区別しない)
+        """
+        targets = [t.lower() for t in target_sectors]
+        hits = []
+        for code in codes:
+            entry = self._entries.get(code)
+            if not entry:
+                continue
+            company_sector = str(entry.get("sector") or "Unknown").lower()
+            if any(target in company_sector for target in targets):
+                hits.append(code)
+        return hits
@@ -1,74 +0,0 @@
-# stock_codes_list.py
-# Generated by main.py on 2025-12-29
-STOCK_CODES_LIST = [
-    "BQC.SI",
-    "40V.SI",
-    "BBW.SI",
-    "F9D.SI",
-    "544.SI",
-    "AWV.SI",
-    "532.SI",
-    "I07.SI",
-    "AJBU.SI",
-    "5OC.SI",
-    "5FX.SI",
-    "YYN.SI",
-    "5G4.SI",
-    "42F.SI",
-    "V2Y.SI",
-    "NXR.SI",
-    "A31.SI",
-    "BAI.SI",
-    "Y3D.SI",
-    "N01.SI",
-    "CJLU.SI",
-    "Z74.SI",
-    "Z77.SI",
-    "CC3.SI",
-    "T41.SI",
-    "585.SI",
-    "F13.SI",
-    "M03.SI",
-    "AWZ.SI",
-    "BDA.SI",
-    "580.SI",
-    "564.SI",
-    "AWX.SI",
-    "QZG.SI",
-    "AYV.SI",
-    "5EF.SI",
-    "AWG.SI",
-    "BXE.SI",
-    "5EB.SI",
-    "C33.SI",
-    "C76.SI",
-    "BIX.SI",
-    "E28.SI",
-    "QS9.SI",
-    "G20.SI",
-    "AYN.SI",
-    "JLB.SI",
-    "5GZ.SI",
-    "1J4.SI",
-    "J03.SI",
-    "K29.SI",
-    "M11.SI",
-    "SJY.SI",
-    "5DD.SI",
-    "MZH.SI",
-    "5BI.SI",
-    "BCY.SI",
-    "I11.SI",
-    "BHU.SI",
-    "S69.SI",
-    "S71.SI",
-    "581.SI",
-    "AWI.SI",
-    "E27.SI",
-    "5AB.SI",
-    "CYW.SI",
-    "BN2.SI",
-    "V03.SI",
-    "BDR.SI",
-    "B49.SI",
-]
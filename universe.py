@@ -0,0 +1,170 @@
+# universe.py
+# ASEAN銘柄ユニバースの登録簿 (asean_universe.csv)
+# 銘柄コードは重複なし。国 (サフィックス)・取引所・市場区分ごとの索引を読み込み時に作る
+import os
+import csv
+import threading
+
+UNIVERSE_FILE = os.getenv(
+    "ASEAN_UNIVERSE_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "asean_universe.csv")
+)
+
+# 国コード -> 銘柄コードのサフィックス
+SUFFIX_MAP = {
+    "SG": ".SI", "MY": ".KL", "ID": ".JK",
+    "TH": ".BK", "VN": ".VN", "PH": ".PS"
+}
+# サフィックス -> 取引所 (サフィックスだけで決まるもの)
+# .VN は HOSE と HNX の両方で使われるので、ここには入れない (スクリーナーの取引所名で埋める)
+EXCHANGE_MAP = {
+    ".SI": "SGX", ".KL": "Bursa", ".JK": "IDX",
+    ".BK": "SET", ".PS": "PSE"
+}
+COLUMNS = ("code", "country", "exchange", "board")
+
+
+def suffix_of(code):
+    """".SI" などのサフィックス (無い場合は空文字)"""
+    code = str(code)
+    return "." + code.rsplit(".", 1)[1].upper() if "." in code else ""
+
+
+def board_of(code):
+    """
+    市場区分。コードの形から判定できるマレーシア (Main / ACE / LEAP) だけを返し、
+    他の国は不明なので空文字 (SGX Catalist, SET mai などはコードから区別できない)。
+    """
+    code = str(code)
+    if code.endswith(".KL"):
+        ticker_clean = code[:-len(".KL")]
+        if len(ticker_clean) == 5 and ticker_clean.startswith("03"):
+            return "LEAP"
+        if len(ticker_clean) == 4 and ticker_clean.startswith("0"):
+            return "ACE"
+        if len(ticker_clean) == 4 and ticker_clean[0] in "123456789":
+            return "Main"
+        return "Main/Other"
+    return ""
+
+
+def make_entry(code, exchange=None):
+    """
+    銘柄コードから登録簿の1行を作る。
+    exchange: スクリーナーの取引所名 (あればサフィックスからの推定より優先する)。分からなければ空文字。
+    """
+    code = str(code).strip().upper()
+    suffix = suffix_of(code)
+    country = next((c for c, s in SUFFIX_MAP.items() if s == suffix), "")
+    exchange = exchange or EXCHANGE_MAP.get(suffix, "")
+    return {"code": code, "country": country, "exchange": exchange, "board": board_of(code)}
+
+
+class Universe:
+    """
+    登録簿は初めて使われた時に1回だけ読み込む。
+    by_country / by_suffix / by_exchange / by_board は作成済みの索引を引くだけ (O(1))。
+    取引所・市場区分が分からない銘柄は空欄 (by_board("Main") などには含まれない)。
+    返すリストは登録簿の順番。
+    """
+
+    def __init__(self, path=UNIVERSE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = None
+        self._index = None
+
+    def _ensure_loaded(self):
+        with self._lock:
+            if self._entries is not None:
+                return
+            entries = {}
+            with open(self.path, "r", encoding="utf-8", newline="") as f:
+                for row in csv.DictReader(f):
+                    code = (row.get("code") or "").strip()
+                    if code and code not in entries:
+                        entries[code] = {k: (row.get(k) or "").strip() for k in COLUMNS}
+
+            index = {"suffix": {}, "country": {}, "exchange": {}, "board": {}}
+            for code, entry in entries.items():
+                index["suffix"].setdefault(suffix_of(code), []).append(code)
+                for key in ("country", "exchange", "board"):
+                    index[key].setdefault(entry[key].upper(), []).append(code)
+            self._index = {key: {k: tuple(v) for k, v in table.items()} for key, table in index.items()}
+            self._entries = entries
+
+    @property
+    def codes(self):
+        self._ensure_loaded()
+        return tuple(self._entries)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __contains__(self, code):
+        self._ensure_loaded()
+        return code in self._entries
+
+    def entry(self, code):
+        self._ensure_loaded()
+        return self._entries.get(code)
+
+    def _lookup(self, key, value):
+        self._ensure_loaded()
+        return self._index[key].get(str(value).upper(), ())
+
+    def by_suffix(self, suffix):
+        return self._lookup("suffix", suffix if str(suffix).startswith(".") else f".{suffix}")
+
+    def by_country(self, country):
+        return self._lookup("country", country)
+
+    def by_exchange(self, exchange):
+        return self._lookup("exchange", exchange)
+
+    def by_board(self, board):
+        return self._lookup("board", board)
+
+    def select(self, countries=None, boards=None):
+        """
+        国と市場区分で絞り込む (None は条件なし)。
+        例: select(["SG", "MY"]), select(["MY"], boards=["ACE", "LEAP"])
+        """
+        if countries is None:
+            codes = self.codes
+        else:
+            codes = [code for country in dict.fromkeys(countries) for code in self.by_country(country)]
+        if boards is not None:
+            wanted = {code for board in boards for code in self.by_board(board)}
+            codes = [code for code in codes if code in wanted]
+        return list(codes)
+
+
+_universe = None
+
+
+def get_universe():
+    """プロセス内で共有する登録簿 (読み込みは初回アクセス時)"""
+    global _universe
+    if _universe is None:
+        _universe = Universe()
+    return _universe
+
+
+def write_universe(codes, path=UNIVERSE_FILE, exchanges=None):
+    """
+    銘柄コードの一覧から登録簿を作り直す (重複は最初の1件だけ残す)。
+    exchanges: {code: 取引所名}。スクリーナーの quote から作る場合は
+      {q["symbol"]: q.get("fullExchangeName") or q.get("exchange") for q in quotes}
+    """
+    exchanges = exchanges or {}
+    entries = {}
+    for code in codes:
+        entry = make_entry(code, exchanges.get(str(code).strip().upper()))
+        if entry["code"] and entry["code"] not in entries:
+            entries[entry["code"]] = entry
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        writer.writerows(entries.values())
+    print(f"登録簿を保存しました: {path} ({len(entries)} 銘柄)")
+    return len(entries)
@@ -0,0 +1,182 @@
+# yahoo_cache.py
+# Yahoo Financeの生レスポンスをローカルに保存するキャッシュ
+# (銘柄コード x データ種別 ごとに1ファイル, 種別ごとに有効期限が異なる)
+import os
+import sys
+import time
+import pickle
+import shutil
+import datetime
+import threading
+
+# キャッシュの保存先
+CACHE_DIR = os.getenv("YAHOO_CACHE_DIR", ".yahoo_cache")
+
+# False にするとキャッシュを使わず毎回取得する
+ENABLED = True
+
+# データ種別ごとの有効期限 (秒)
+# quote: 株価系はザラ場中に変わるので短め
+# holders: 株主は四半期程度でしか変わらない
+QUOTE_TTL = 15 * 60
+HOLDERS_TTL = 7 * 24 * 60 * 60
+# 決算期末を過ぎても新しい決算が出るまでは、1日ごとに再確認する
+STATEMENT_RECHECK_TTL = 24 * 60 * 60
+# not_found: 存在しない/上場廃止の銘柄は、しばらく問い合わせない
+NOT_FOUND_TTL = 7 * 24 * 60 * 60
+# 空のデータ (取得に失敗して空の DataFrame / dict が返ってきた場合など) は短い期限でだけ保存する
+EMPTY_TTL = 60 * 60
+
+# 財務諸表として扱う種別 (次の決算期末まで有効)
+STATEMENT_KINDS = ("balance_sheet", "financials")
+
+_lock = threading.Lock()
+
+
+def _cache_path(ticker_symbol, kind):
+    safe_symbol = str(ticker_symbol).replace("/", "_").replace("=", "_")
+    return os.path.join(CACHE_DIR, kind, f"{safe_symbol}.pkl")
+
+
+def _end_of_today():
+    """今日の終わり (翌日0時) のタイムスタンプ"""
+    tomorrow = datetime.date.today() + datetime.timedelta(days=1)
+    return datetime.datetime.combine(tomorrow, datetime.time.min).timestamp()
+
+
+def statement_expiry(last_fiscal_year_end):
+    """
+    財務諸表の有効期限 = 次の決算期末 (lastFiscalYearEnd + 1年)。
+    期末を過ぎている (新しい決算がまだ出ていない) 場合は1日ごとに再確認する。
+    """
+    now = time.time()
+    if last_fiscal_year_end:
+        try:
+            last_fy = datetime.datetime.fromtimestamp(last_fiscal_year_end)
+            try:
+                next_fy = last_fy.replace(year=last_fy.year + 1)
+            except ValueError:
+                # 2/29 対策
+                next_fy = last_fy + datetime.timedelta(days=365)
+            return max(next_fy.timestamp(), now + STATEMENT_RECHECK_TTL)
+        except (TypeError, ValueError, OverflowError, OSError):
+            pass
+    return now + STATEMENT_RECHECK_TTL
+
+
+def default_expiry(kind):
+    """種別ごとのデフォルト有効期限 (タイムスタンプ)"""
+    now = time.time()
+    if kind == "quote":
+        return now + QUOTE_TTL
+    if kind == "info":
+        return _end_of_today()
+    if kind in ("major_holders", "institutional_holders"):
+        return now + HOLDERS_TTL
+    if kind in STATEMENT_KINDS:
+        return now + STATEMENT_RECHECK_TTL
+    if kind == "not_found":
+        return now + NOT_FOUND_TTL
+    return _end_of_today()
+
+
+def is_empty(data):
+    """空の DataFrame / dict / list か"""
+    if getattr(data, "empty", False) is True:
+        return True
+    return isinstance(data, (dict, list, tuple)) and not data
+
+
+def get(ticker_symbol, kind):
+    """
+    キャッシュを読む。戻り値は (ヒットしたか, データ)。
+    期限切れ・破損ファイルはミス扱い。
+    """
+    if not ENABLED:
+        return False, None
+    path = _cache_path(ticker_symbol, kind)
+    try:
+        with open(path, "rb") as f:
+            entry = pickle.load(f)
+    except FileNotFoundError:
+        return False, None
+    except Exception:
+        # 読めないファイルは捨てる
+        _remove(path)
+        return False, None
+
+    if entry.get("expires_at", 0) < time.time():
+        return False, None
+    return True, entry.get("data")
+
+
+def put(ticker_symbol, kind, data, expires_at=None):
+    """キャッシュに書き込む (一時ファイル経由で置き換えるのでスレッドセーフ)"""
+    if not ENABLED or data is None:
+        return
+    path = _cache_path(ticker_symbol, kind)
+    expires_at = expires_at if expires_at else default_expiry(kind)
+    if is_empty(data):
+        # 空の財務諸表を次の決算期末まで使い続けないようにする
+        expires_at = min(expires_at, time.time() + EMPTY_TTL)
+    entry = {
+        "fetched_at": time.time(),
+        "expires_at": expires_at,
+        "data": data,
+    }
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with _lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"  キャッシュ書き込みエラー ({ticker_symbol}/{kind}): {e}")
+        _remove(tmp_path)
+
+
+def cached_fetch(ticker_symbol, kind, fetch_func, expires_at=None):
+    """キャッシュにあればそれを返し、なければ fetch_func() で取得して保存する"""
+    hit, data = get(ticker_symbol, kind)
+    if hit:
+        return data
+    data = fetch_func()
+    put(ticker_symbol, kind, data, expires_at)
+    return data
+
+
+def invalidate(ticker_symbol=None, kind=None):
+    """
+    キャッシュを明示的に削除する。
+    引数なし: 全削除 / ticker_symbol のみ: その銘柄の全種別 / kind のみ: その種別の全銘柄
+    """
+    if not os.path.isdir(CACHE_DIR):
+        return
+    if ticker_symbol is None and kind is None:
+        shutil.rmtree(CACHE_DIR, ignore_errors=True)
+        return
+    if ticker_symbol is None:
+        shutil.rmtree(os.path.join(CACHE_DIR, kind), ignore_errors=True)
+        return
+    kinds = [kind] if kind else os.listdir(CACHE_DIR)
+    for k in kinds:
+        _remove(_cache_path(ticker_symbol, k))
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+if __name__ == "__main__":
+    # 使い方: python yahoo_cache.py clear [銘柄コード] [種別]
+    if len(sys.argv) >= 2 and sys.argv[1] == "clear":
+        target_symbol = sys.argv[2] if len(sys.argv) > 2 else None
+        target_kind = sys.argv[3] if len(sys.argv) > 3 else None
+        invalidate(target_symbol, target_kind)
+        print(f"キャッシュを削除しました: {target_symbol or '全銘柄'} / {target_kind or '全種別'}")
+    else:
+        print("使い方: python yahoo_cache.py clear [銘柄コード] [種別]")
@@ -3,98 +3,549 @@ import requests
 import yfinance as yf
 import time
 import json
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-def get_stock_data(ticker_symbol):
+from yfinance.data import YfData
+from yfinance.exceptions import YFTickerMissingError
+
+import rate_limiter
+import run_journal
+import yahoo_cache
+
+# yfinance は既定で取得時の例外を握りつぶし、空の DataFrame / dict を返す。
+# それだと空のデータがキャッシュされたり、リミッターや結果の分類に例外が届かないので、例外のまま受け取る
+yf.config.debug.hide_exceptions = False
+
+# --- 並列取得の設定 ---
+# 同時に処理する銘柄数 (スレッド数)
+MAX_WORKERS = 8
+# Yahoo Financeへの総リクエスト数/秒 (全スレッド共通)
+REQUESTS_PER_SECOND = 4.0
+
+# 全スレッドで共有するリミッター (固定sleepの代わり)
+# 429やタイムアウトを検知すると同時実行数とリクエスト数/秒を自動で下げ、再試行する
+_yahoo_limiter = rate_limiter.get_limiter(
+    "yahoo", max_concurrency=MAX_WORKERS, max_rate=REQUESTS_PER_SECOND
+)
+
+def _cached_property(ticker_symbol, ticker, kind, expires_at=None):
+    """
+    ticker の各プロパティ (info, balance_sheet など) をキャッシュ経由で読む。
+    キャッシュミスの時だけリミッター経由でHTTPリクエストを発生させる。
+    """
+    def fetch():
+        # yfinanceのプロパティは読み込み時にHTTPリクエストが発生する
+        return _yahoo_limiter.call(getattr, ticker, kind)
+    return yahoo_cache.cached_fetch(ticker_symbol, kind, fetch, expires_at)
+
+# --- 取得計画: 出力項目 -> 必要なエンドポイント ---
+ALL_ENDPOINTS = ("info", "balance_sheet", "financials", "major_holders", "institutional_holders")
+
+# 財務諸表から計算する項目 (最新期の判定に balance_sheet も使うので両方必要)
+STATEMENT_FIELDS = (
+    "REVENUE", "PROFIT", "GROSS PROFIT", "OPERATING PROFIT",
+    "NET PROFIT (Group)", "NET PROFIT (Shareholders)", "Minority Interest",
+    "Shareholders' Equity", "Total Equity", "TOTAL ASSET",
+    "Debt/Equity(%)", "Loan", "Loan/Equity (%)",
+)
+FIELD_ENDPOINTS = {field: ("balance_sheet", "financials") for field in STATEMENT_FIELDS}
+FIELD_ENDPOINTS["Major Shareholders"] = ("major_holders", "institutional_holders")
+
+# 補助的なエンドポイント -> 元のエンドポイント (元が空の時だけワーカー内で取得する)
+FALLBACK_ENDPOINTS = {"institutional_holders": "major_holders"}
+
+def plan_endpoints(fields=None):
+    """
+    必要な出力項目から、取得するエンドポイントを決める。
+    fields=None なら全項目。上記以外の項目 (会社名, セクター等) は info から取る。
+    """
+    if fields is None:
+        return ALL_ENDPOINTS
+    endpoints = {"info"}
+    for field in fields:
+        endpoints.update(FIELD_ENDPOINTS.get(field, ("info",)))
+    return tuple(kind for kind in ALL_ENDPOINTS if kind in endpoints)
+
+class LazyRawData:
     """
-    指定された銘柄コードの全データを取得する
+    get_stock_data の戻り値 (raw_data) と同じように .get(kind) で使えるが、
+    各エンドポイントは初めて読まれた時にだけ取得する。
+    計画に含まれないエンドポイントは取得せず default を返す。
     """
+
+    def __init__(self, ticker_symbol, endpoints=ALL_ENDPOINTS):
+        self.ticker_symbol = ticker_symbol
+        self.endpoints = tuple(endpoints)
+        self._ticker = yf.Ticker(ticker_symbol)
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def _statement_expiry(self):
+        # 財務諸表は次の決算期末までキャッシュを使う (info がまだ無ければキャッシュから探す)
+        info = self._data.get("info")
+        if info is None:
+            _, info = yahoo_cache.get(self.ticker_symbol, "info")
+        return yahoo_cache.statement_expiry((info or {}).get('lastFiscalYearEnd'))
+
+    def _load(self, kind):
+        with self._lock:
+            if kind not in self._data:
+                expires_at = self._statement_expiry() if kind in yahoo_cache.STATEMENT_KINDS else None
+                self._data[kind] = _cached_property(self.ticker_symbol, self._ticker, kind, expires_at)
+            return self._data[kind]
+
+    def preload(self):
+        """
+        補助的なもの以外の計画済みエンドポイントを今すぐ取得する。
+        info 以外のエンドポイントの取得に失敗した場合は、そのエンドポイントだけ空にして他のデータは残す
+        (制限や一時的なエラーは例外のまま返し、再試行キューに回す)。
+        補助的なものは元のエンドポイントが空の時だけ、ここ (ワーカースレッド) で取得しておく。
+        """
+        for kind in self.endpoints:
+            if kind in FALLBACK_ENDPOINTS:
+                continue
+            try:
+                self._load(kind)
+            except Exception as e:
+                if kind == "info" or rate_limiter.classify_error(e) in RETRYABLE:
+                    raise
+                print(f"  データなし ({self.ticker_symbol}/{kind}): {e}")
+                with self._lock:
+                    self._data[kind] = None
+        for kind, primary in FALLBACK_ENDPOINTS.items():
+            if kind in self.endpoints and getattr(self.get(primary), "empty", True):
+                self.get(kind)
+        return self
+
+    def get(self, kind, default=None):
+        if kind not in self.endpoints:
+            return default
+        try:
+            value = self._load(kind)
+        except Exception as e:
+            print(f"  エラー発生 ({self.ticker_symbol}/{kind}): {e}")
+            with self._lock:
+                self._data[kind] = None
+            return default
+        return default if value is None else value
+
+    def __getitem__(self, kind):
+        return self.get(kind)
+
+    def __contains__(self, kind):
+        return kind in self.endpoints
+
+    @property
+    def fetched_endpoints(self):
+        return list(self._data)
+
+# --- 取得結果の種類 ---
+FETCH_OK = rate_limiter.OK
+NOT_FOUND = "not_found"       # 存在しない / 上場廃止 / サフィックス違い -> しばらく問い合わせない
+THROTTLED = rate_limiter.THROTTLED
+TRANSIENT = rate_limiter.TRANSIENT
+# 実行の最後にもう一度だけ取得し直す結果
+RETRYABLE = (THROTTLED, TRANSIENT)
+# 再試行キューを処理する前に待つ秒数 (制限の解除を待つ)
+RETRY_DELAY = 30
+
+def _http_status(error):
+    """例外に付いている HTTP ステータス (無ければ None)"""
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None)
+
+def classify_fetch_error(error):
+    """
+    取得時の例外を NOT_FOUND / THROTTLED / TRANSIENT に分類する。
+    NOT_FOUND は例外の型か HTTP ステータス (404) だけで判定する (メッセージの文字列では判定しない)。
+    銘柄ごと NOT_FOUND として記録するかどうかは呼び出し側が決める (info の取得失敗の時だけ)。
+    """
+    if isinstance(error, YFTickerMissingError) or _http_status(error) == 404:
+        return NOT_FOUND
+    if rate_limiter.classify_error(error) == THROTTLED:
+        return THROTTLED
+    return TRANSIENT
+
+def _is_missing_info(info):
+    """info が空、または空に近い dict (銘柄名も価格も無い) か"""
+    if not info:
+        return True
+    return not any(info.get(k) for k in ("quoteType", "longName", "shortName", "regularMarketPrice"))
+
+def _mark_not_found(ticker_symbol):
+    """存在しない銘柄として記録する (不要な info のキャッシュは消す)"""
+    yahoo_cache.invalidate(ticker_symbol)
+    yahoo_cache.put(ticker_symbol, "not_found", True)
+
+def fetch_stock_data(ticker_symbol, fields=None):
+    """
+    指定された銘柄コードのデータを取得し、(結果の種類, raw_data) を返す。
+    fields: 必要な出力項目 (None なら全項目)。計画に含まれるエンドポイントだけを取得する。
+    例: fields=("Sector", "Industry") なら info だけ。
+    補助的なもの (institutional_holders) は major_holders が空の時だけ取得する。
+    存在しない銘柄 (info の取得が YFTickerMissingError / 404) は NOT_FOUND としてキャッシュし、
+    期限まではHTTPリクエストを送らない。例外なしで info が空の場合は TRANSIENT (再試行キュー)。
+    """
+    hit, _ = yahoo_cache.get(ticker_symbol, "not_found")
+    if hit:
+        print(f"  スキップ ({ticker_symbol}): 存在しない銘柄として記録済み")
+        return NOT_FOUND, None
+
     print(f"  データ取得中: {ticker_symbol} ...")
     
+    # info で銘柄の存在を確認してから、残りのエンドポイントを取得する
+    # (銘柄ごと NOT_FOUND として記録するのは info の取得に失敗した時だけ)
     try:
-        ticker = yf.Ticker(ticker_symbol)
-        
-        # サーバー負荷を避けるため少し待つ
-        time.sleep(1) 
-        
-        # 株主データ取得のデバッグ
-        inst = ticker.institutional_holders
-        major = ticker.major_holders
-        
-        return {
-            "info": ticker.info,
-            "balance_sheet": ticker.balance_sheet,
-            "financials": ticker.financials,
-            "major_holders": major,
-            "institutional_holders": inst
-        }
-        
+        raw_data = LazyRawData(ticker_symbol, plan_endpoints(fields))
+        info = raw_data._load("info")
     except Exception as e:
-        print(f"  エラー発生 ({ticker_symbol}): {e}")
-        return None
+        outcome = classify_fetch_error(e)
+        print(f"  エラー発生 ({ticker_symbol}, {outcome}): {e}")
+        if outcome == NOT_FOUND:
+            _mark_not_found(ticker_symbol)
+        return outcome, None
 
-# --- ★★★ 追加機能: Yahoo Financeから全銘柄リストを取得 ★★★ ---
-def fetch_all_tickers_from_yahoo(region_code):
+    if _is_missing_info(info):
+        # 例外なしで空の info が返ってきた場合は存在しないとは言い切れないので、再試行キューに回す
+        # (存在しない銘柄は例外の型か 404 で NOT_FOUND になる)
+        print(f"  info が空でした ({ticker_symbol}, {TRANSIENT})")
+        yahoo_cache.invalidate(ticker_symbol, "info")
+        return TRANSIENT, None
+
+    try:
+        return FETCH_OK, raw_data.preload()
+    except Exception as e:
+        # 制限や一時的なエラー (404 のエンドポイントは preload 内で空にしている)
+        outcome = classify_fetch_error(e)
+        print(f"  エラー発生 ({ticker_symbol}, {outcome}): {e}")
+        return outcome, None
+
+def get_stock_data(ticker_symbol, fields=None):
+    """fetch_stock_data の raw_data だけを返す (失敗時は None)"""
+    return fetch_stock_data(ticker_symbol, fields)[1]
+
+def _iter_outcomes(codes, workers):
+    """(code, 結果の種類, raw_data) を完了順に返す"""
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(fetch_stock_data, code): code for code in codes}
+        for future in as_completed(futures):
+            outcome, raw_data = future.result()
+            yield futures[future], outcome, raw_data
+
+def fetch_all_stock_data(codes, max_workers=None, requests_per_second=None):
     """
-    Yahoo FinanceのスクリーナーAPIを叩いて、
-    指定された地域(sg, my, id, th, vn, ph)の「全株式銘柄」を取得する。
+    複数銘柄をスレッドプールで並列取得する。
+    戻り値は入力と同じ順番の [(code, raw_data), ...] (失敗時 raw_data は None)。
+    Excelの Ref 番号がずれないよう、完了順ではなく入力順に並べ直す。
     """
-    print(f"\nYahoo Financeから '{region_code}' 地域の全銘柄リストをダウンロード中...")
-    
-    # Yahoo FinanceのスクリーナーAPIエンドポイント
-    url = "https://query2.finance.yahoo.com/v1/finance/screener/predefined/saved"
-    
-    # 地域のマッピング (Yahoo Financeの定義に合わせる)
-    # シンガポール: sg, マレーシア: my, インドネシア: id, タイ: th, ベトナム: vn, フィリピン: ph
-    
-    # ページネーション対応 (一度に最大250件しか取れないためループする)
-    all_symbols = []
-    offset = 0
-    size = 250
-    
-    # ブラウザのふりをするヘッダー (これがないと弾かれる)
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+    codes = list(codes)
+    results = dict(iter_stock_data(codes, max_workers, requests_per_second))
+    return [(code, results.get(code)) for code in codes]
+
+def iter_stock_data(codes, max_workers=None, requests_per_second=None):
+    """
+    fetch_all_stock_data と同じ並列取得だが、取得が終わった銘柄から順に
+    (code, raw_data) を返すジェネレーター (順番は完了順)。
+    結果を1件ずつ保存したい場合に使う。
+    制限 (429) や一時的なエラーで失敗した銘柄は最後にまとめてもう一度だけ取得し、
+    その結果を返す。存在しない銘柄はすぐに None を返す。
+    """
+    workers = max_workers or MAX_WORKERS
+    _yahoo_limiter.configure(max_concurrency=workers, max_rate=requests_per_second)
+
+    codes = list(dict.fromkeys(codes))
+    print(f"並列取得開始: {len(codes)} 銘柄 (ワーカー数: {workers}, 上限: {_yahoo_limiter.max_rate:g} req/秒)")
+
+    counts = {FETCH_OK: 0, NOT_FOUND: 0, THROTTLED: 0, TRANSIENT: 0}
+    retry_queue = []
+    for code, outcome, raw_data in _iter_outcomes(codes, workers):
+        if outcome in RETRYABLE:
+            retry_queue.append(code)
+            continue
+        counts[outcome] += 1
+        yield code, raw_data
+
+    if retry_queue:
+        print(f"\n再試行キュー: {len(retry_queue)} 銘柄を {RETRY_DELAY} 秒後にもう一度取得します...")
+        time.sleep(RETRY_DELAY)
+        for code, outcome, raw_data in _iter_outcomes(retry_queue, workers):
+            counts[outcome] += 1
+            if outcome != FETCH_OK:
+                print(f"  {code}: 再試行でも取得できませんでした ({outcome})")
+            yield code, raw_data
+
+    print(
+        f"取得結果: 成功 {counts[FETCH_OK]} / 存在しない {counts[NOT_FOUND]} / "
+        f"制限 {counts[THROTTLED]} / 一時エラー {counts[TRANSIENT]}"
+    )
+
+# --- 株価・発行株数・時価総額の一括取得 (quote API) ---
+QUOTE_URL = "https://query1.finance.yahoo.com/v7/finance/quote"
+# 1リクエストでまとめて問い合わせる銘柄数
+QUOTE_BATCH_SIZE = 100
+# quote API から使う項目だけを残す (ticker.info のような重いデータは取らない)
+QUOTE_FIELDS = (
+    "symbol", "currency", "regularMarketPrice", "regularMarketPreviousClose",
+    "regularMarketTime", "sharesOutstanding", "marketCap",
+)
+
+def _fetch_quote_batch(symbols):
+    """quote API を1回呼び、{symbol: quote} を返す (応答に無い銘柄は含まれない)"""
+    params = {"symbols": ",".join(symbols), "formatted": "false", "lang": "en-US"}
+    # YfData は yfinance と同じセッション (cookie/crumb) を使う
+    data = _yahoo_limiter.call(YfData().get_raw_json, QUOTE_URL, params=params)
+    results = (data or {}).get("quoteResponse", {}).get("result") or []
+    return {
+        q["symbol"]: {k: q.get(k) for k in QUOTE_FIELDS}
+        for q in results if q.get("symbol")
     }
 
-    while True:
-        params = {
-            "formatted": "false",
-            "lang": "en-US",
-            "region": region_code, # US, SG, MY ...
-            "scrIds": "all_equities", # 「全ての株式」という条件
-            "count": size,
-            "start": offset
-        }
-        
+def fetch_quotes(symbols, batch_size=None):
+    """
+    複数銘柄の株価・発行株数・時価総額を quote API でまとめて取得する。
+    ticker.info を銘柄ごとに取るより軽く、batch_size 銘柄で1リクエストになる。
+    戻り値: {symbol: quote}。取得できなかった銘柄は含まれない。
+    """
+    size = batch_size or QUOTE_BATCH_SIZE
+    symbols = list(dict.fromkeys(symbols))
+
+    quotes = {}
+    missing = []
+    for symbol in symbols:
+        hit, quote = yahoo_cache.get(symbol, "quote")
+        if hit and quote:
+            quotes[symbol] = quote
+        else:
+            missing.append(symbol)
+
+    if missing:
+        print(f"株価を一括取得中: {len(missing)} 銘柄 ({size} 銘柄/リクエスト)")
+    for i in range(0, len(missing), size):
+        batch = missing[i:i + size]
         try:
-            response = requests.get(url, headers=headers, params=params, timeout=10)
-            
-            if response.status_code != 200:
-                print(f"  APIエラー: {response.status_code}")
-                break
-                
-            data = response.json()
-            quotes = data.get("finance", {}).get("result", [])[0].get("quotes", [])
-            
-            if not quotes:
-                break # データがなくなったら終了
-            
-            for quote in quotes:
-                symbol = quote.get("symbol")
-                if symbol:
-                    all_symbols.append(symbol)
-            
-            print(f"  ... {len(all_symbols)} 件取得済み")
-            
-            if len(quotes) < size:
-                break # 最後のページ
-                
-            offset += size
-            time.sleep(0.5) # 負荷軽減
-            
+            fetched = _fetch_quote_batch(batch)
         except Exception as e:
-            print(f"  取得中にエラー発生: {e}")
-            break
-            
-    print(f"完了: 合計 {len(all_symbols)} 件の銘柄が見つかりました。")
-    return all_symbols
\ No newline at end of file
+            print(f"  株価の一括取得に失敗 ({batch[0]} ほか {len(batch)} 銘柄): {e}")
+            continue
+        for symbol, quote in fetched.items():
+            yahoo_cache.put(symbol, "quote", quote)
+        quotes.update(fetched)
+
+    return quotes
+
+# --- 決算期の軽い確認 (差分更新用) ---
+QUOTE_SUMMARY_URL = "https://query2.finance.yahoo.com/v10/finance/quoteSummary/"
+# この2つが変わっていなければ、財務諸表は前回と同じとみなす
+PERIOD_FIELDS = ("lastFiscalYearEnd", "mostRecentQuarter")
+
+def fiscal_periods_from_info(info):
+    """ticker.info から決算期の情報だけを取り出す"""
+    return {k: (info or {}).get(k) for k in PERIOD_FIELDS}
+
+def _fetch_fiscal_periods(ticker_symbol):
+    """defaultKeyStatistics モジュールだけを取得する (ticker.info 全体より軽い)"""
+    params = {"modules": "defaultKeyStatistics", "formatted": "false", "lang": "en-US"}
+    data = _yahoo_limiter.call(YfData().get_raw_json, QUOTE_SUMMARY_URL + ticker_symbol, params=params)
+    results = (data or {}).get("quoteSummary", {}).get("result") or [{}]
+    stats = results[0].get("defaultKeyStatistics") or {}
+    periods = {}
+    for k in PERIOD_FIELDS:
+        value = stats.get(k)
+        periods[k] = value.get("raw") if isinstance(value, dict) else value
+    return periods
+
+def get_fiscal_periods(ticker_symbol):
+    """決算期の情報 (キャッシュ対応)。取得できなければ None"""
+    try:
+        return yahoo_cache.cached_fetch(
+            ticker_symbol, "periods", lambda: _fetch_fiscal_periods(ticker_symbol)
+        )
+    except Exception as e:
+        print(f"  決算期の確認に失敗 ({ticker_symbol}): {e}")
+        return None
+
+def fetch_fiscal_periods(codes, max_workers=None):
+    """複数銘柄の決算期を並列で確認する。戻り値: {code: periods または None}"""
+    codes = list(dict.fromkeys(codes))
+    if not codes:
+        return {}
+    print(f"決算期を確認中: {len(codes)} 銘柄 ...")
+    with ThreadPoolExecutor(max_workers=max_workers or MAX_WORKERS) as executor:
+        return dict(zip(codes, executor.map(get_fiscal_periods, codes)))
+
+# --- ★★★ 追加機能: Yahoo Financeから全銘柄リストを取得 ★★★ ---
+# Yahoo FinanceのスクリーナーAPIエンドポイント
+SCREENER_URL = "https://query2.finance.yahoo.com/v1/finance/screener/predefined/saved"
+# 一度に最大250件しか取れないためページを分けて取得する
+SCREENER_PAGE_SIZE = 250
+# シンガポール: sg, マレーシア: my, インドネシア: id, タイ: th, ベトナム: vn, フィリピン: ph
+ASEAN_REGIONS = ("sg", "my", "id", "th", "vn", "ph")
+
+# ブラウザのふりをするヘッダー (これがないと弾かれる)
+SCREENER_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+_screener_session = None
+_screener_session_lock = threading.Lock()
+
+def _get_screener_session():
+    """全地域で共有する接続プール付きのセッション (地域ごとに接続を張り直さない)"""
+    global _screener_session
+    with _screener_session_lock:
+        if _screener_session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=len(ASEAN_REGIONS), pool_maxsize=len(ASEAN_REGIONS)
+            )
+            session.mount("https://", adapter)
+            session.headers.update(SCREENER_HEADERS)
+            _screener_session = session
+        return _screener_session
+
+def _fetch_screener_page(region_code, offset):
+    """スクリーナーの1ページ分の quote を返す (失敗時は例外。リミッターが429等を再試行する)"""
+    params = {
+        "formatted": "false",
+        "lang": "en-US",
+        "region": region_code,
+        "scrIds": "all_equities", # 「全ての株式」という条件
+        "count": SCREENER_PAGE_SIZE,
+        "start": offset
+    }
+
+    def request():
+        response = _get_screener_session().get(SCREENER_URL, params=params, timeout=10)
+        response.raise_for_status()
+        return response.json()
+
+    data = _yahoo_limiter.call(request)
+    results = data.get("finance", {}).get("result") or [{}]
+    return results[0].get("quotes") or []
+
+def _page_key(job_key, offset):
+    return f"{job_key}:{offset:08d}"
+
+def _download_pages(job_key, fetch_page, checkpoint, out_queue):
+    """
+    1つの検索 (地域など) をページ順に取得して out_queue に流す。
+    ページごとにチェックポイントへ書くので、途中で失敗しても次回はその続きから取得できる。
+    """
+    try:
+        # 前回までに取得済みのページはチェックポイントから流す
+        saved_pages = sorted(
+            (key, page) for key, page in checkpoint.items() if key.startswith(f"{job_key}:")
+        )
+        for _, page in saved_pages:
+            out_queue.put(("quotes", job_key, page["quotes"]))
+        if checkpoint.get_meta(f"done:{job_key}"):
+            return
+
+        offset = checkpoint.get_meta(f"next_offset:{job_key}", 0)
+        while True:
+            quotes = fetch_page(offset)
+            if quotes:
+                checkpoint.append(_page_key(job_key, offset), {"quotes": quotes})
+                out_queue.put(("quotes", job_key, quotes))
+            offset += len(quotes)
+            checkpoint.set_meta(f"next_offset:{job_key}", offset)
+            print(f"  ... [{job_key}] {offset} 件取得済み")
+
+            if len(quotes) < SCREENER_PAGE_SIZE:
+                checkpoint.set_meta(f"done:{job_key}", True)
+                break # 最後のページ
+    except Exception as e:
+        out_queue.put(("error", job_key, e))
+    finally:
+        out_queue.put(("end", job_key, None))
+
+def _stream_screener(jobs, checkpoint_name, resume=False):
+    """
+    jobs ({key: fetch_page(offset)}) を並列に取得し、quote を1件ずつ返すジェネレーター。
+    失敗した検索があれば、取得できた分を流し終えた後に RuntimeError を投げる。
+    全ての検索が最後まで取得できたらチェックポイントは消す (次の --resume で古いページを使わない)。
+    """
+    checkpoint = run_journal.RunJournal(run_journal.journal_path(checkpoint_name), resume=resume)
+
+    out_queue = queue.Queue()
+    threads = [
+        threading.Thread(target=_download_pages, args=(key, fetch_page, checkpoint, out_queue), daemon=True)
+        for key, fetch_page in jobs.items()
+    ]
+    for thread in threads:
+        thread.start()
+
+    total = 0
+    failed = {}
+    running = len(threads)
+    while running:
+        kind, job_key, payload = out_queue.get()
+        if kind == "end":
+            running -= 1
+        elif kind == "error":
+            failed[job_key] = payload
+            print(f"  [{job_key}] 取得中にエラー発生: {payload}")
+        else:
+            for quote in payload:
+                if quote.get("symbol"):
+                    total += 1
+                    yield dict(quote, region=quote.get("region", job_key))
+
+    print(f"完了: 合計 {total} 件の銘柄が見つかりました。")
+    if failed:
+        raise RuntimeError(
+            f"{', '.join(failed)} の取得が途中で失敗しました。"
+            f"resume=True で続きから取得できます ({checkpoint.path})"
+        )
+    checkpoint.clear()
+
+def fetch_all_tickers_from_yahoo(regions=ASEAN_REGIONS, resume=False):
+    """
+    Yahoo FinanceのスクリーナーAPIを叩いて、指定された地域 (sg, my, id, th, vn, ph) の
+    「全株式銘柄」の quote (symbol, sector, exchange, marketCap など全項目) を1件ずつ返すジェネレーター。
+    地域ごとに並列で取得し、取得できたページから順に流す (地域をまたいだ順番は保証しない)。
+    resume=True なら前回失敗した地域を、取得済みのページの続きから取得する。
+    途中で失敗した地域があれば、取得できた分を流し終えた後に RuntimeError を投げる。
+    """
+    if isinstance(regions, str):
+        regions = (regions,)
+    regions = tuple(dict.fromkeys(r.lower() for r in regions))
+    print(f"\nYahoo Financeから {', '.join(regions)} 地域の全銘柄リストをダウンロード中...")
+
+    jobs = {
+        region: (lambda offset, region=region: _fetch_screener_page(region, offset))
+        for region in regions
+    }
+    yield from _stream_screener(jobs, f"screener_{'_'.join(regions)}", resume)
+
+def _fetch_screen_page(query, offset):
+    """条件付きスクリーナー (yf.screen) の1ページ分の quote を返す"""
+    result = _yahoo_limiter.call(
+        yf.screen, query, offset=offset, size=SCREENER_PAGE_SIZE, sortField="ticker", sortAsc=True
+    )
+    return (result or {}).get("quotes") or []
+
+def screener_sectors():
+    """スクリーナーで指定できるセクター名 (完全一致でしか絞り込めない)"""
+    return set(yf.EquityQuery("is-in", ["region", "sg"]).valid_values.get("sector", ()))
+
+def screen_equities(regions, sectors, resume=False):
+    """
+    国 (region) とセクターの条件をスクリーナーに送り、該当する銘柄の quote だけを返すジェネレーター。
+    銘柄ごとに info を取得して絞り込む代わりに、数ページ分のリクエストで済む。
+    regions: ("sg", "my", ...), sectors: ("Technology", "Real Estate", ...)
+    """
+    regions = tuple(dict.fromkeys(r.lower() for r in regions))
+    sectors = tuple(dict.fromkeys(sectors))
+    print(f"\nスクリーナーで検索中: 地域 {', '.join(regions)} / セクター {', '.join(sectors)} ...")
+
+    query = yf.EquityQuery("and", [
+        yf.EquityQuery("is-in", ["region", *regions]),
+        yf.EquityQuery("is-in", ["sector", *sectors]),
+    ])
+    # 検索条件ごとにチェックポイントを分ける
+    name = f"screen_{'_'.join(regions)}_{'_'.join(s.replace(' ', '-') for s in sectors)}"
+    jobs = {"screen": (lambda offset: _fetch_screen_page(query, offset))}
+    yield from _stream_screener(jobs, name, resume)